@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_ollama import FakeOllamaServer
+
+# Translator's default backend reads OLLAMA_HOST when it is created
+server = FakeOllamaServer().start()
+os.environ["OLLAMA_HOST"] = server.url
+
+from subtitle_translator_v36 import Translator, canonical_word
+
+WORDS = (
+    "hola amigo qué tal estás hoy quiero hablar contigo sobre la casa de mi madre "
+    "nunca pensé que volverías tan pronto después de todo lo que pasó aquel verano "
+    "en la playa cuando éramos niños y corríamos sin miedo hacia el mar azul profundo"
+).split()
+
+
+def single(translator, words):
+    return {canonical_word(word): translator.translate_word(word) for word in words}
+
+
+def batched(translator, words, batch_size):
+    results = {}
+    for i in range(0, len(words), batch_size):
+        results.update(translator.translate_words(words[i:i + batch_size]))
+    return results
+
+
+def measure(label, fn):
+    requests_before = server.requests
+    start = time.perf_counter()
+    results = fn()
+    elapsed = time.perf_counter() - start
+    requests = server.requests - requests_before
+    print(f"{label:<18} {len(results):>3} words, {requests:>3} requests, "
+          f"{elapsed:6.2f} s, {len(results) / elapsed:6.2f} words/s")
+    return results
+
+
+if __name__ == "__main__":
+    # One entry per lemma, as the cache keys them
+    words = list({canonical_word(word): word for word in WORDS}.values())
+    # No cache: every run goes to the (fake) model
+    translator = Translator("gemma3:1b-it-qat")
+    expected = measure("single-word", lambda: single(translator, words))
+    for batch_size in (4, 8, 16):
+        results = measure(f"batch of {batch_size}", lambda: batched(translator, words, batch_size))
+        assert results == expected, "batch results differ from single-word results"
+    server.shutdown()
@@ -0,0 +1,69 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from subtitle_translator_v36 import Cue, CueTimeline
+
+
+def make_cues(count, overlap_every=25):
+    cues = []
+    t = 1.0
+    for i in range(count):
+        duration = random.uniform(1.0, 4.0)
+        end = t + duration
+        # Every so often let a cue overlap the next one, as in real dialogue
+        if i % overlap_every == 0:
+            end += 1.5
+        cues.append({'start': t, 'end': end, 'text': f"linea {i}"})
+        t += duration + random.uniform(0.1, 1.5)
+    return cues
+
+
+def linear_lookup(cues, current_time):
+    for sub in cues:
+        if sub['start'] <= current_time <= sub['end']:
+            return sub['text']
+    return ""
+
+
+def playback_ticks(duration, step=0.25, seeks=20):
+    ticks = []
+    t = 0.0
+    seek_points = set(random.sample(range(int(duration / step)), seeks))
+    for i in range(int(duration / step)):
+        if i in seek_points:
+            t = random.uniform(0, duration)
+        ticks.append(t)
+        t += step
+    return ticks
+
+
+def run(count):
+    cues = make_cues(count)
+    timeline = CueTimeline(Cue(c['start'], c['end'], c['text']) for c in cues)
+    ticks = playback_ticks(cues[-1]['end'])
+
+    start = time.perf_counter()
+    expected = [linear_lookup(cues, t) for t in ticks]
+    linear = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = [timeline.text_at(t) for t in ticks]
+    indexed = time.perf_counter() - start
+
+    assert expected == actual, "timeline lookup disagrees with linear scan"
+    per_tick_linear = linear / len(ticks) * 1e6
+    per_tick_indexed = indexed / len(ticks) * 1e6
+    print(f"{count:>6} cues, {len(ticks):>6} ticks: "
+          f"linear {per_tick_linear:8.2f} us/tick, "
+          f"timeline {per_tick_indexed:6.2f} us/tick, "
+          f"speedup {per_tick_linear / per_tick_indexed:7.1f}x")
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    for count in (500, 2000, 5000):
+        run(count)
@@ -0,0 +1,111 @@
+import math
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from subtitle_translator_v36 import (LEXICON_PATH, LemmaIndex, canonical_word, iter_srt_cues,
+                                     lemma_index, normalize_word, subtitle_words)
+
+# Usage: bench_lemmatizer.py [file.srt ...]
+# Counts how many distinct cache keys (and so model requests) a film's
+# vocabulary needs under the old punctuation-only key, the new surface key and
+# the lemma key. Without arguments it runs on the dialogue below, which is
+# only illustrative; pass a real subtitle file for real numbers.
+
+DIALOGUE = """
+¿Qué haces aquí? Te dije que no vinieras.
+—Hablaba con tu madre. Dice que no quieres hablar con nadie.
+Hablamos mañana, ¿vale? Ahora no puedo.
+¡No me digas lo que tengo que hacer!
+Siempre dices lo mismo. Nunca escuchas.
+«Volveré», me dijo. Y nunca volvió.
+Yo quería creerle. Todos queríamos creerle.
+¿Dónde estabas anoche? Te estuve buscando.
+Estaba en casa. Estuve allí toda la noche.
+Si tuviera dinero, me iría de esta ciudad.
+Nos vamos. ¡Vámonos de aquí!
+Dímelo otra vez. Quiero oírlo.
+No sé qué decirte. Lo siento mucho.
+Ella sabía la verdad. Todos la sabíamos.
+¿Puedes ayudarme? Necesito que me ayudes.
+Me ayudó cuando nadie más me ayudaba.
+Pensé que estabas muerto. Pensábamos lo peor.
+Encontraron el coche. Lo encontramos junto al río.
+Cállate y escúchame. Escucha bien.
+¿Por qué lloras? No llores, por favor.
+Lloró toda la noche. Lloraba sin parar.
+Tenemos que irnos. Tienes que venir conmigo.
+Vendrán a buscarnos. Ya vienen.
+Duerme un poco. No he dormido en dos días.
+¿Conoces a este hombre? Lo conocí en Madrid.
+Me pidió que te lo diera. Te lo pido yo también.
+Siga las instrucciones. Seguimos el plan.
+Empezó a llover. Empecemos de nuevo.
+Perdimos todo. Lo he perdido todo.
+¿Me oyes? Te oigo perfectamente.
+Hazlo ahora. Hicimos lo que pudimos.
+Cuando era niño, jugaba en esta calle.
+Fuimos felices aquí. Éramos jóvenes.
+Ojalá pudiera verte otra vez. Te veo mañana.
+Pon la mesa. Pusieron las sillas fuera.
+No lo creo. ¿Tú lo crees?
+Trabajaba de noche. Trabajamos juntos.
+Si lo hubieras sabido, ¿qué habrías hecho?
+Llamé tres veces. ¿Por qué no llamaste?
+Las llaves están en la mesa. Dame las llaves.
+"""
+
+
+def old_key(word):
+    # The key before lemmatization: lowercase, minus . , ! ?
+    return re.sub(r"[.,!?]", "", word.lower()).strip()
+
+
+def load_words(paths):
+    if not paths:
+        return DIALOGUE.split()
+    words = []
+    for path in paths:
+        for cue in iter_srt_cues(path):
+            words.extend(cue.text.split())
+    return words
+
+
+def report(label, keys, occurrences, batch_size=8):
+    print(f"{label:<22} {len(keys):>6} keys, {len(keys) / occurrences * 100:5.1f}% of occurrences, "
+          f"{len(keys):>6} single-word requests / {math.ceil(len(keys) / batch_size):>5} batches of {batch_size}")
+
+
+if __name__ == "__main__":
+    words = load_words(sys.argv[1:])
+    old = {old_key(word) for word in words} - {""}
+    surface = {normalize_word(word) for word in words} - {""}
+    lemmas = {canonical_word(word) for word in words} - {""}
+    print(f"{len(words)} word occurrences")
+    report("old key (.,!? only)", old, len(words))
+    report("surface key", surface, len(words))
+    report("lemma key", lemmas, len(words))
+    print(f"model calls cut by {(1 - len(lemmas) / len(old)) * 100:.1f}% vs the old key, "
+          f"{(1 - len(lemmas) / len(surface)) * 100:.1f}% vs the surface key")
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        built = LemmaIndex.open(LEXICON_PATH, directory)
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        LemmaIndex.open(LEXICON_PATH, directory)
+        reopen = time.perf_counter() - start
+        size = os.path.getsize(os.path.join(directory, os.listdir(directory)[0]))
+    print(f"index: {len(built)} forms, {size / 1e3:.0f} kB, build {build * 1e3:.1f} ms, reopen {reopen * 1e3:.2f} ms")
+
+    index = lemma_index()
+    keys = [key for word in words for _, key in subtitle_words(word) if key]
+    start = time.perf_counter()
+    for key in keys:
+        index.lemma(key)
+    lookup = time.perf_counter() - start
+    print(f"uncached lookup {lookup / len(keys) * 1e6:.2f} us/word")
@@ -0,0 +1,98 @@
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from subtitle_translator_v36 import CueTimeline, iter_srt_cues
+
+LINES = [
+    "Hola, ¿qué tal?",
+    "No sé qué decirte.",
+    "Nunca pensé que volverías tan pronto.",
+    "1984",
+    "¡Vámonos de aquí!",
+    "Es la casa de mi madre.",
+]
+
+
+def srt_time(seconds):
+    ms = int(round(seconds * 1000))
+    h, ms = divmod(ms, 3600000)
+    m, ms = divmod(ms, 60000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02}:{m:02}:{s:02},{ms:03}"
+
+
+def write_synthetic_srt(path, count, newline="\r\n"):
+    # Roughly what a concatenated dump of real subtitles looks like: CRLF line
+    # endings, a BOM, one- and two-line cues, numeric cue text
+    t = 1.0
+    with open(path, "w", encoding="utf-8-sig", newline=newline) as f:
+        for i in range(1, count + 1):
+            duration = random.uniform(1.0, 4.0)
+            text = random.choice(LINES)
+            if i % 3 == 0:
+                text += "\n" + random.choice(LINES)
+            f.write(f"{i}\n{srt_time(t)} --> {srt_time(t + duration)}\n{text}\n\n")
+            t += duration + random.uniform(0.1, 1.5)
+
+
+def regex_parse(path):
+    # The whole-file DOTALL regex parser this replaced, for comparison
+    with open(path, "r", encoding="utf-8-sig") as f:
+        content = f.read()
+    pattern = re.compile(r'(\d+)\s+(\d{2}:\d{2}:\d{2},\d{3})\s*-->\s*(\d{2}:\d{2}:\d{2},\d{3})\s+(.+?)(?=\n\n|\Z)', re.DOTALL)
+    subtitles = []
+    for match in pattern.finditer(content):
+        idx, start, end, text = match.groups()
+        subtitles.append({'start': start, 'end': end, 'text': text.replace('\n', ' ').strip()})
+    return subtitles
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def peak_memory(fn):
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def run(count, directory):
+    path = os.path.join(directory, f"synthetic_{count}.srt")
+    write_synthetic_srt(path, count)
+    size_mb = os.path.getsize(path) / 1e6
+
+    regex_cues, regex_time = timed(lambda: regex_parse(path))
+    streamed, stream_time = timed(lambda: sum(1 for _ in iter_srt_cues(path)))
+    timeline, timeline_time = timed(lambda: CueTimeline(iter_srt_cues(path)))
+    assert streamed == len(timeline) == count, (streamed, len(timeline), count)
+
+    print(f"{count:>8} cues ({size_mb:6.1f} MB): "
+          f"regex {regex_time:6.2f} s ({len(regex_cues)} cues), "
+          f"stream {stream_time:6.2f} s, "
+          f"stream + timeline {timeline_time:6.2f} s")
+    if count <= 100000:
+        # tracemalloc slows parsing down a lot, so only sample the smaller files
+        stream_peak = peak_memory(lambda: sum(1 for _ in iter_srt_cues(path)))
+        regex_peak = peak_memory(lambda: regex_parse(path))
+        print(f"{'':>8} peak memory: regex {regex_peak / 1e6:7.1f} MB, stream {stream_peak / 1e6:5.2f} MB")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    counts = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    with tempfile.TemporaryDirectory() as directory:
+        for count in counts:
+            run(count, directory)
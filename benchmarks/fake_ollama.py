@@ -0,0 +1,93 @@
+import json
+import os
+import sys
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from subtitle_translator_v36 import StubBackend
+
+# A stand-in for the Ollama HTTP API (/api/generate, non-streaming): the
+# app's StubBackend served over HTTP, with its latency model of a fixed
+# per-request overhead plus a per-token generation cost. Requests are served
+# one at a time, like a single loaded model.
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), request_overhead=0.12, per_token=0.02):
+        super().__init__(address, FakeOllamaHandler)
+        self.backend = StubBackend(request_overhead, per_token)
+        self.connections = 0
+
+    @property
+    def requests(self):
+        return self.backend.requests
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def generate(self, body):
+        if "prompt" not in body:
+            return "", 0  # A keep-alive warm-up only loads the model
+        text = self.backend.generate(body.get("model", ""), body["prompt"], body.get("format"))
+        return text, len(text.split())
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without TCP_NODELAY, Nagle
+    # plus the client's delayed ACK adds ~40 ms to every reply (Ollama sets it too)
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1  # Counts TCP connections, to see keep-alive at work
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path in ("/", "/api/version"):
+            self._reply(200, {"version": "0.0.0-fake"})
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/api/generate":
+            self._reply(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        text, tokens = self.server.generate(body)
+        self._reply(200, {
+            "model": body.get("model", ""),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "response": text,
+            "done": True,
+            "done_reason": "stop",
+            "eval_count": tokens,
+        })
+
+
+if __name__ == "__main__":
+    server = FakeOllamaServer(("127.0.0.1", 11435))
+    print(f"Fake Ollama listening on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+# Stand-ins for the parts of Tk and VLC the player's hot paths touch, so they
+# can be benchmarked on a machine without a display or libVLC. Under a
+# virtual display (xvfb-run) the harness uses real Tk widgets instead.
+
+
+class FakeWidget:
+    # Records what the overlay does to a widget; nothing is drawn
+    def __init__(self, master=None, **options):
+        self.master = master
+        self.options = dict(options)
+        self.mapped = False
+        self.bindings = {}
+
+    def config(self, **options):
+        self.options.update(options)
+
+    configure = config
+
+    def cget(self, key):
+        return self.options.get(key, "")
+
+    def pack(self, **options):
+        self.mapped = True
+
+    def pack_forget(self):
+        self.mapped = False
+
+    def bind(self, sequence, callback):
+        self.bindings[sequence] = callback
+
+    def winfo_ismapped(self):
+        return self.mapped
+
+    def winfo_width(self):
+        return self.options.get("width", 1)
+
+    def update_idletasks(self):
+        pass
+
+
+class FakeFont:
+    # Average glyph width scaled by point size: close enough for line breaking
+    def __init__(self, family=None, size=12, weight="normal"):
+        self.size = size
+
+    def measure(self, text):
+        return int(len(text) * self.size * 0.62)
+
+
+def install_tk_stub(module):
+    # Point the module's tk / tkinter.font names at the fakes; the real
+    # tkinter package is left alone
+    module.tk = SimpleNamespace(Frame=FakeWidget, Label=FakeWidget, LEFT="left", RIGHT="right", X="x",
+                                TclError=Exception)
+    module.tkinter = SimpleNamespace(font=SimpleNamespace(Font=FakeFont))
+
+
+class FakeVlcClock:
+    # Plays the part of PlayerState: time_ms moves the way VLC's
+    # MediaPlayerTimeChanged events would move it during playback and seeks
+    def __init__(self):
+        self.time_ms = 0
+        self.playing = True
+        self.length_ms = 0
+
+    def advance(self, ms):
+        self.time_ms += ms
+
+    def seeked(self, time_ms):
+        self.time_ms = time_ms
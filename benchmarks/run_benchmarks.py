@@ -0,0 +1,286 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import subtitle_translator_v36 as app_module
+from bench_cue_lookup import playback_ticks
+from bench_srt_parser import write_synthetic_srt
+from fake_ollama import FakeOllamaServer
+from headless import FakeVlcClock, FakeWidget, install_tk_stub
+from subtitle_translator_v36 import (OllamaBackend, PrefetchScheduler, StubBackend, SubtitleOverlay,
+                                     SubtitleTranslatorApp, TranslationCache, TranslationJournal, Translator)
+
+# Usage: run_benchmarks.py [--quick] [--tk auto|real|stub] [--output results.json]
+#
+# Runs the player's hot paths without a display, libVLC or a model and
+# prints one JSON document (latency percentiles, throughput, peak traced
+# memory) that can be diffed between commits. Tk is stubbed unless a display
+# is available; run under `xvfb-run` with --tk real to include real widgets.
+# Synthetic inputs are seeded, so runs on the same machine are comparable.
+
+FULL = {'srt_cues': [2000, 100000], 'journal_rows': [10000, 50000, 100000], 'appends': 1000, 'words': 200}
+QUICK = {'srt_cues': [2000], 'journal_rows': [1000, 5000], 'appends': 200, 'words': 50}
+
+
+def progress(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def latency_summary(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {'count': 0}
+    n = len(samples)
+    pick = lambda q: samples[min(n - 1, int(q * n))]
+    return {
+        'count': n,
+        'mean_ms': round(sum(samples) / n * 1000, 4),
+        'p50_ms': round(pick(0.50) * 1000, 4),
+        'p95_ms': round(pick(0.95) * 1000, 4),
+        'p99_ms': round(pick(0.99) * 1000, 4),
+        'max_ms': round(samples[-1] * 1000, 4),
+    }
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def peak_kb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def make_tk(mode):
+    # Real widgets when asked for (or when a display is there), else the stub
+    if mode in ("auto", "real"):
+        try:
+            root = app_module.tk.Tk()
+            root.withdraw()
+            return "real", root, app_module.tk.Frame(root)
+        except Exception as e:
+            if mode == "real":
+                raise SystemExit(f"--tk real needs a display (try xvfb-run): {e}")
+    install_tk_stub(app_module)
+    return "stub", None, FakeWidget()
+
+
+def app_shell(timeline, clock, overlay, prefetcher):
+    # The player's update path on its own: the real methods, with just the
+    # state update_subtitles and render_subtitle read, and no window or VLC
+    app = SubtitleTranslatorApp.__new__(SubtitleTranslatorApp)
+    app.player_state = clock
+    app.subtitles = timeline
+    app.prefetcher = prefetcher
+    app.overlay_renderer = overlay
+    app.video_frame = FakeWidget(width=1280)
+    app.subtitle_font_size = 24
+    app.last_subtitle_text = None
+    app.rendered_geometry = None
+    app.translation_box = None
+    return app
+
+
+def bench_parse(directory, counts):
+    results = {}
+    for count in counts:
+        path = os.path.join(directory, f"synthetic_{count}.srt")
+        write_synthetic_srt(path, count)
+        timeline, seconds = timed(lambda: SubtitleTranslatorApp.parse_srt_file(None, path))
+        assert len(timeline) == count, (len(timeline), count)
+        results[str(count)] = {
+            'cues': count,
+            'file_mb': round(os.path.getsize(path) / 1e6, 2),
+            'seconds': round(seconds, 4),
+            'cues_per_second': round(count / seconds),
+            'peak_kb': peak_kb(lambda: SubtitleTranslatorApp.parse_srt_file(None, path)),
+        }
+        progress(f"parse_srt_file {count}: {seconds:.2f} s")
+    return results
+
+
+def bench_update_subtitles(directory, tk_mode, cues=2000):
+    mode, root, frame = make_tk(tk_mode)
+    path = os.path.join(directory, "playback.srt")
+    write_synthetic_srt(path, cues)
+    timeline = SubtitleTranslatorApp.parse_srt_file(None, path)
+    overlay = SubtitleOverlay(frame, on_word_click=lambda word, label: None)
+    translator = Translator("bench", cache=TranslationCache(os.path.join(directory, "prefetch.db")),
+                            backend=StubBackend())
+    prefetcher = PrefetchScheduler(translator)
+    clock = FakeVlcClock()
+    app = app_shell(timeline, clock, overlay, prefetcher)
+
+    ticks = playback_ticks(timeline.ends[-1], step=0.25, seeks=20)
+    unchanged = []
+    rebuilt = []
+    for t in ticks:
+        clock.seeked(int(t * 1000))
+        before = app.last_subtitle_text
+        start = time.perf_counter()
+        app.update_subtitles()
+        if root is not None:
+            root.update_idletasks()  # Include Tk's geometry pass for the new labels
+        elapsed = time.perf_counter() - start
+        (rebuilt if app.last_subtitle_text != before else unchanged).append(elapsed)
+    prefetcher.shutdown()
+    translator.cache.conn.close()
+    if root is not None:
+        root.destroy()
+    progress(f"update_subtitles: {len(ticks)} ticks, {len(rebuilt)} overlay rebuilds ({mode} Tk)")
+    return {
+        'tk': mode,
+        'cues': cues,
+        'tick': latency_summary(unchanged + rebuilt),
+        'tick_without_change': latency_summary(unchanged),
+        'tick_with_overlay_rebuild': latency_summary(rebuilt),
+        'line_pool': sum(len(line.labels) for line in overlay.lines),
+    }
+
+
+def write_journal(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(rows):
+            f.write(json.dumps({'word': f"palabra{i}", 'translation': f"word {i}", 'sentence': f"Frase número {i}."},
+                               ensure_ascii=False) + "\n")
+
+
+def bench_save_translation(directory, sizes, appends):
+    results = {}
+    for rows in sizes:
+        path = os.path.join(directory, f"journal_{rows}.jsonl")
+        xlsx_path = os.path.join(directory, f"translations_{rows}.xlsx")
+        write_journal(path, rows)
+        journal, load_seconds = timed(lambda: TranslationJournal(path))
+        app = SubtitleTranslatorApp.__new__(SubtitleTranslatorApp)
+        app.journal = journal
+        samples = []
+        for i in range(appends):
+            start = time.perf_counter()
+            app.save_translation(f"nueva{rows}x{i}", f"new {i}", "Una frase nueva.")
+            samples.append(time.perf_counter() - start)
+        _, flush_seconds = timed(journal.close)
+        count, export_seconds = timed(lambda: journal.export_xlsx(xlsx_path))
+
+        def load_and_append():
+            reloaded = TranslationJournal(path)
+            app.journal = reloaded
+            for i in range(appends):
+                app.save_translation(f"otra{rows}x{i}", f"other {i}", "Otra frase.")
+            reloaded.close()
+        result = {
+            'rows': rows,
+            'exported_rows': count,
+            'journal_load_seconds': round(load_seconds, 4),
+            'save_translation': latency_summary(samples),
+            'journal_flush_seconds': round(flush_seconds, 4),
+            'export_xlsx_seconds': round(export_seconds, 4),
+            'xlsx_kb': round(os.path.getsize(xlsx_path) / 1024, 1),
+            'load_and_append_peak_kb': peak_kb(load_and_append),
+        }
+        if rows <= 10000:
+            # Traced openpyxl runs several times slower, so only the small export is sampled
+            result['export_xlsx_peak_kb'] = peak_kb(lambda: journal.export_xlsx(xlsx_path))
+        results[str(rows)] = result
+        progress(f"save_translation {rows} rows: export {export_seconds:.2f} s")
+    return results
+
+
+def bench_translate_word(directory, words, model_latency):
+    server = FakeOllamaServer(request_overhead=model_latency, per_token=0.0).start()
+    translator = Translator("bench", cache=TranslationCache(os.path.join(directory, "translate.db")),
+                            backend=OllamaBackend(server.url))
+    vocabulary = [f"palabra{i}" for i in range(words)]
+    cold = []
+    for word in vocabulary:
+        start = time.perf_counter()
+        translation = translator.translate_word(word)
+        cold.append(time.perf_counter() - start)
+        assert translation == StubBackend.translate(word), translation
+    warm = []
+    for word in vocabulary:
+        start = time.perf_counter()
+        translator.translate_word(word)
+        warm.append(time.perf_counter() - start)
+    result = {
+        'model_latency_ms': model_latency * 1000,
+        'model_round_trip': latency_summary(cold),
+        'cache_hit': latency_summary(warm),
+        'requests': server.requests,
+        'connections': server.connections,
+    }
+    translator.close()
+    translator.cache.conn.close()
+    server.shutdown()
+    progress(f"translate_word: {server.requests} requests over {server.connections} connection(s)")
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless benchmarks for the subtitle translator's hot paths")
+    parser.add_argument("--quick", action="store_true", help="smaller inputs, for a smoke test")
+    parser.add_argument("--tk", choices=["auto", "real", "stub"], default="auto",
+                        help="real Tk needs a display, e.g. xvfb-run (default: %(default)s)")
+    parser.add_argument("--model-latency", type=float, default=0.0,
+                        help="seconds the fake model takes per request; 0 measures the client alone")
+    parser.add_argument("--output", help="write the JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    random.seed(0)
+    sizes = QUICK if args.quick else FULL
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory() as directory:
+        # Keep the lemma index and anything else the app caches out of the user's cache dir
+        os.environ["LOCALAPPDATA"] = directory
+        results = {
+            'parse_srt_file': bench_parse(directory, sizes['srt_cues']),
+            'update_subtitles': bench_update_subtitles(directory, args.tk),
+            'save_translation': bench_save_translation(directory, sizes['journal_rows'], sizes['appends']),
+            'translate_word': bench_translate_word(directory, sizes['words'], args.model_latency),
+        }
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'quick': args.quick,
+            'seconds': round(time.perf_counter() - started, 1),
+        },
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
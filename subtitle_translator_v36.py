@@ -4,16 +4,1913 @@ import tkinter.font
 import vlc
 import re
 from datetime import datetime
-import ollama
 import time
 import subprocess
-import tempfile
 import os
 import openpyxl
 import tkinter.ttk as ttk
+import argparse
+import codecs
+import hashlib
+import http.client
+import io
+import itertools
+import logging
+import math
+import mmap
+import struct
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import queue
+import json
+import socket
+import sqlite3
+import sys
+import threading
+import urllib.parse
+
+def safe_print(text):
+    try:
+        print(text)
+    except UnicodeEncodeError:
+        print(text.encode('utf-8', 'ignore').decode('ascii', 'ignore'))
+
+# Diagnostics go through logging (off below WARNING unless --log-level says
+# otherwise); safe_print is kept for the command line's own report
+log = logging.getLogger("subtitle_translator")
+
+class LatencyHistogram:
+    # Log-spaced buckets, 8 per doubling from 10 us up to ~3 minutes, so a
+    # sample costs one log2 and percentiles are good to within ~9%
+    MIN_SECONDS = 1e-5
+    PER_DOUBLING = 8
+    BUCKETS = PER_DOUBLING * 24
+
+    def __init__(self):
+        self.counts = [0] * (self.BUCKETS + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @classmethod
+    def bucket(cls, seconds):
+        if seconds <= cls.MIN_SECONDS:
+            return 0
+        return min(cls.BUCKETS, int(math.log2(seconds / cls.MIN_SECONDS) * cls.PER_DOUBLING) + 1)
+
+    def record(self, seconds, bucket=None):
+        self.counts[self.bucket(seconds) if bucket is None else bucket] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q):
+        # Upper edge of the bucket holding the q-th sample, capped at the largest seen
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bucket, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                return min(self.max, self.MIN_SECONDS * 2 ** (bucket / self.PER_DOUBLING))
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(0.50) * 1000, 3),
+            'p95_ms': round(self.percentile(0.95) * 1000, 3),
+            'p99_ms': round(self.percentile(0.99) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+        }
+
+class Metrics:
+    # Latency histograms per stage (cue_lookup, overlay_render, model_request,
+    # cache_lookup, journal_write, excel_export, ffprobe, ffmpeg_extract,
+    # click_to_translation), kept both since startup and for the window since
+    # the last rollover. Callers time with perf_counter and call record(), or
+    # use timed() where a context manager reads better. Components with their
+    # own counters (cache hits, prefetch hits) register a stats() callable
+    # with add_counters() and are reported alongside the latencies.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.window_started = self.started
+        self.total = {}
+        self.window = {}
+        self.counters = {}
+
+    def add_counters(self, name, stats):
+        self.counters[name] = stats
+
+    def record(self, stage, seconds):
+        bucket = LatencyHistogram.bucket(seconds)
+        with self.lock:
+            for histograms in (self.total, self.window):
+                histogram = histograms.get(stage)
+                if histogram is None:
+                    histogram = histograms[stage] = LatencyHistogram()
+                histogram.record(seconds, bucket)
+
+    @contextmanager
+    def timed(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def summary(self, rollover=False):
+        now = time.time()
+        with self.lock:
+            summary = {
+                'uptime_s': round(now - self.started, 1),
+                'window_s': round(now - self.window_started, 1),
+                'window': {stage: h.summary() for stage, h in sorted(self.window.items())},
+                'total': {stage: h.summary() for stage, h in sorted(self.total.items())},
+            }
+            if rollover:
+                self.window = {}
+                self.window_started = now
+            counters = dict(self.counters)
+        # Counters are cumulative since startup and are not rolled over
+        summary['counters'] = {name: stats() for name, stats in sorted(counters.items())}
+        return summary
+
+    def dump(self, path):
+        # One JSON document, replaced atomically; each dump starts a new window
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(rollover=True), f, indent=2)
+        os.replace(temp_path, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        # GET /metrics returns the current summary as JSON, without rolling the window over
+        metrics = self
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                data = json.dumps(metrics.summary()).encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        return server
+
+METRICS = Metrics()
+
+WORD_EDGES = re.compile(r"^[\W_]+|[\W_]+$")
+
+def normalize_word(word):
+    # Case, Unicode composition and surrounding punctuation (¿¡«»"…) do not make a different word
+    return WORD_EDGES.sub("", unicodedata.normalize('NFC', word).lower())
+
+def cue_key(text):
+    return ' '.join(text.split())
+
+def subtitle_words(text):
+    # (display word, surface key) pairs, exactly as the overlay makes words clickable
+    return [(word, normalize_word(word)) for word in text.split()]
+
+# Spanish lemma lexicon: a small text source (verbs with their conjugation
+# quirks, irregular forms, a stop list) that is expanded once into a sorted
+# binary index and memory-mapped, so every process shares one read-only copy
+# and a lookup is a binary search over the mapped pages.
+LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lexicon_es.txt')
+LEXICON_VERSION = b"2"  # Bump when the conjugation rules change, to rebuild cached indexes
+
+VERB_ENDINGS = {
+    'ar': {
+        'present': ('o', 'as', 'a', 'amos', 'áis', 'an'),
+        'preterite': ('é', 'aste', 'ó', 'amos', 'asteis', 'aron'),
+        'imperfect': ('aba', 'abas', 'aba', 'ábamos', 'abais', 'aban'),
+        'subjunctive': ('e', 'es', 'e', 'emos', 'éis', 'en'),
+        'gerund': 'ando', 'participle': 'ado',
+    },
+    'er': {
+        'present': ('o', 'es', 'e', 'emos', 'éis', 'en'),
+        'preterite': ('í', 'iste', 'ió', 'imos', 'isteis', 'ieron'),
+        'imperfect': ('ía', 'ías', 'ía', 'íamos', 'íais', 'ían'),
+        'subjunctive': ('a', 'as', 'a', 'amos', 'áis', 'an'),
+        'gerund': 'iendo', 'participle': 'ido',
+    },
+    'ir': {
+        'present': ('o', 'es', 'e', 'imos', 'ís', 'en'),
+        'preterite': ('í', 'iste', 'ió', 'imos', 'isteis', 'ieron'),
+        'imperfect': ('ía', 'ías', 'ía', 'íamos', 'íais', 'ían'),
+        'subjunctive': ('a', 'as', 'a', 'amos', 'áis', 'an'),
+        'gerund': 'iendo', 'participle': 'ido',
+    },
+}
+FUTURE_ENDINGS = ('é', 'ás', 'á', 'emos', 'éis', 'án')
+CONDITIONAL_ENDINGS = ('ía', 'ías', 'ía', 'íamos', 'íais', 'ían')
+BOOT = (0, 1, 2, 5)  # Persons whose stressed stem vowel changes: pienso, piensas, piensa, piensan
+STEM_CHANGES = {'ie': ('e', 'ie', 'i'), 'ue': ('o', 'ue', 'u'), 'i': ('e', 'i', 'i')}
+ENCLITICS = ('nos', 'les', 'los', 'las', 'me', 'te', 'se', 'lo', 'la', 'le', 'os')
+ACCENTED = str.maketrans('áéíóú', 'aeiou')
+STRESSED = str.maketrans('aeiou', 'áéíóú')
+
+def _change_stem(stem, old, new):
+    at = stem.rfind(old)
+    return stem if at < 0 else stem[:at] + new + stem[at + len(old):]
+
+def _spell(infinitive, stem, ending, zc=False):
+    # Keep the stem's sound before the ending: busqué, llegué, empecé, cojo, sigo, conozco
+    first = ending[:1]
+    if infinitive.endswith('ar') and first in ('e', 'é'):
+        for end, spelled in (('c', 'qu'), ('g', 'gu'), ('z', 'c')):
+            if stem.endswith(end):
+                return stem[:-1] + spelled + ending
+    elif not infinitive.endswith('ar') and first in ('a', 'o', 'á'):
+        if infinitive.endswith('guir') and stem.endswith('gu'):
+            return stem[:-1] + ending
+        if infinitive.endswith(('ger', 'gir')) and stem.endswith('g'):
+            return stem[:-1] + 'j' + ending
+        if zc and stem.endswith('c'):
+            return stem[:-1] + 'zc' + ending
+    return stem + ending
+
+def conjugate(infinitive, options=()):
+    # Every surface form of a verb: the lexicon's "verb" records, e.g.
+    # "tener ie yo=teng fut=tendr pret=tuv"
+    group = infinitive[-2:]
+    if group not in VERB_ENDINGS:
+        return []
+    endings = VERB_ENDINGS[group]
+    flags = {option for option in options if '=' not in option}
+    stems = dict(option.split('=', 1) for option in options if '=' in option)
+    zc = 'zc' in flags
+    stem = infinitive[:-2]
+    strong = weak = stem
+    for change in flags & STEM_CHANGES.keys():
+        old, new, narrow = STEM_CHANGES[change]
+        strong = _change_stem(stem, old, new)
+        if group == 'ir':
+            weak = _change_stem(stem, old, narrow)
+    forms = [infinitive, infinitive[:-1] + 'd']  # plus the vosotros imperative
+    for person, ending in enumerate(endings['present']):
+        if person == 0 and 'yo' in stems:
+            forms.append(stems['yo'] + ending)
+        else:
+            forms.append(_spell(infinitive, strong if person in BOOT else stem, ending, zc))
+    for person, ending in enumerate(endings['subjunctive']):
+        if 'yo' in stems:
+            forms.append(stems['yo'] + ending)
+        else:
+            forms.append(_spell(infinitive, strong if person in BOOT else weak, ending, zc))
+    if 'pret' in stems:
+        pret = stems['pret']
+        preterite = [pret + ending for ending in ('e', 'iste', 'o', 'imos', 'isteis')]
+        preterite.append(pret + ('eron' if pret.endswith('j') else 'ieron'))
+    else:
+        preterite = [_spell(infinitive, weak if person in (2, 5) else stem, ending)
+                     for person, ending in enumerate(endings['preterite'])]
+    forms.extend(preterite)
+    # Past subjunctive from the third person plural preterite: hablaron -> hablara, hablásemos
+    base = preterite[5][:-3]
+    stressed = base[:-1] + base[-1].translate(STRESSED)
+    for mood in ('ra', 'se'):
+        forms.extend((base + mood, base + mood + 's', stressed + mood + 'mos',
+                      base + mood + 'is', base + mood + 'n'))
+    forms.extend(stem + ending for ending in endings['imperfect'])
+    future = stems.get('fut', infinitive)
+    forms.extend(future + ending for ending in FUTURE_ENDINGS + CONDITIONAL_ENDINGS)
+    forms.append(stems.get('ger', weak + endings['gerund']))
+    participle = stems.get('part', stem + endings['participle'])
+    forms.extend((participle, participle[:-1] + 'a', participle + 's', participle[:-1] + 'as'))
+    return forms
+
+def read_lexicon(path):
+    # surface form -> lemma. Explicit `forms` records beat generated
+    # conjugations (una is the article, not a form of unir); otherwise the
+    # first record to claim a form wins.
+    lemmas = {}
+    explicit = {}
+    stops = set()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            fields = [unicodedata.normalize('NFC', field) for field in line.split('#', 1)[0].split()]
+            if len(fields) < 2:
+                continue
+            kind, lemma = fields[0], fields[1]
+            if kind == 'verb':
+                forms = conjugate(lemma, fields[2:])
+            elif kind == 'forms':
+                forms = [lemma] + fields[2:]
+            elif kind == 'stop':
+                stops.update(fields[1:])
+                continue
+            else:
+                continue
+            claimed = explicit if kind == 'forms' else lemmas
+            for form in forms:
+                claimed.setdefault(form, lemma)
+    lemmas.update(explicit)
+    for form in stops:
+        lemmas.pop(form, None)
+    return lemmas
+
+def write_lemma_index(lemmas, path):
+    # Header (magic, count), then one uint32 offset per entry, then the
+    # "surface\tlemma\n" records sorted by their UTF-8 bytes
+    entries = sorted((form.encode('utf-8'), lemma.encode('utf-8')) for form, lemma in lemmas.items())
+    offsets = array('I')
+    records = io.BytesIO()
+    position = 12 + 4 * len(entries)
+    for form, lemma in entries:
+        offsets.append(position + records.tell())
+        records.write(form + b"\t" + lemma + b"\n")
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(LemmaIndex.MAGIC + struct.pack('<I', len(entries)))
+        if sys.byteorder != 'little':
+            offsets.byteswap()
+        f.write(offsets.tobytes())
+        f.write(records.getvalue())
+    os.replace(temp_path, path)
+
+class LemmaIndex:
+    MAGIC = b"LEXIDX1\n"
+
+    def __init__(self, path=None):
+        self.map = None
+        self.count = 0
+        if path:
+            with open(path, 'rb') as f:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, self.count = struct.unpack_from('<8sI', self.map, 0)
+            if magic != self.MAGIC:
+                raise ValueError(f"{path} is not a lemma index")
+
+    @classmethod
+    def open(cls, source_path, cache_dir):
+        # Indexes are named after the source they were built from, so editing
+        # the lexicon (or the rules) builds a fresh one next to the old
+        with open(source_path, 'rb') as f:
+            digest = hashlib.sha1(LEXICON_VERSION + f.read()).hexdigest()[:16]
+        index_path = os.path.join(cache_dir, f"lexicon_{digest}.idx")
+        if not os.path.exists(index_path):
+            write_lemma_index(read_lexicon(source_path), index_path)
+        return cls(index_path)
+
+    def __len__(self):
+        return self.count
+
+    def lookup(self, word):
+        target = word.encode('utf-8')
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = struct.unpack_from('<I', self.map, 12 + 4 * mid)[0]
+            end = self.map.find(b"\n", start)
+            form, _, lemma = self.map[start:end].partition(b"\t")
+            if form < target:
+                lo = mid + 1
+            elif form > target:
+                hi = mid
+            else:
+                return lemma.decode('utf-8')
+        return None
+
+    def lemma(self, word):
+        found = self.lookup(word)
+        if found is not None:
+            return found
+        return self._without_clitics(word) or word
+
+    def _without_clitics(self, word):
+        # dímelo -> di, hacerlo -> hacer, cállate -> calla, diciéndole -> diciendo.
+        # Pronouns only attach to infinitives, gerunds and imperatives, and an
+        # imperative that takes one gains a written accent, so anything else
+        # (este -> es + te) is left alone.
+        plain = word.translate(ACCENTED)
+        rest = word
+        for _ in range(2):
+            clitic = next((c for c in ENCLITICS if rest.endswith(c) and len(rest) > len(c) + 1), None)
+            if clitic is None:
+                return None
+            rest = rest[:-len(clitic)]
+            candidates = [rest.translate(ACCENTED)]
+            if clitic == 'nos':
+                candidates.append(candidates[0] + 's')  # vámonos, sentémonos
+            for candidate in candidates:
+                lemma = self.lookup(candidate)
+                if lemma is None:
+                    continue
+                if candidate == lemma or candidate.endswith('ndo') or plain != word:
+                    return lemma
+        return None
+
+_lemma_index = None
+_lemma_lock = threading.Lock()
+
+def lemma_index():
+    global _lemma_index
+    with _lemma_lock:
+        if _lemma_index is None:
+            try:
+                _lemma_index = LemmaIndex.open(LEXICON_PATH, default_cache_dir())
+            except (OSError, ValueError) as e:
+                log.warning("Lemma index unavailable, keying translations on surface forms: %s", e)
+                _lemma_index = LemmaIndex()
+    return _lemma_index
+
+@lru_cache(maxsize=65536)
+def canonical_word(word):
+    # The key a word's translation is cached, prefetched and logged under:
+    # hablaba, hablamos and ¡Habla! all become "hablar"
+    key = normalize_word(word)
+    return lemma_index().lemma(key) if key else key
+
+SRT_TIMING = re.compile(
+    r'(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})\s*-->\s*(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})'
+)
+
+class Cue:
+    __slots__ = ('start', 'end', 'text')
+
+    def __init__(self, start, end, text):
+        self.start = start
+        self.end = end
+        self.text = text
+
+    def __repr__(self):
+        return f"Cue({self.start:.3f} --> {self.end:.3f}: {self.text!r})"
+
+def srt_time_to_seconds(h, m, s, ms):
+    # "5" after the comma is half a second, as in "00:00:01,5"
+    return int(h) * 3600 + int(m) * 60 + int(s) + int(ms.ljust(3, '0')) / 1000
+
+def detect_encoding(path, sample_size=65536):
+    with open(path, 'rb') as f:
+        head = f.read(sample_size)
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    try:
+        # final=False so a multi-byte character cut off by the sample is not an error
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'cp1252'  # Most common legacy encoding for Spanish subtitles
+
+def _make_cue(timing, lines):
+    text = ' '.join(lines).strip()
+    if not text:
+        return None
+    return Cue(srt_time_to_seconds(*timing.group(1, 2, 3, 4)), srt_time_to_seconds(*timing.group(5, 6, 7, 8)), text)
+
+def parse_srt_lines(lines):
+    # Line-based SRT reader that holds one cue at a time, so arbitrarily large
+    # (or concatenated) files parse in constant memory. Tolerates CRLF, BOMs
+    # (also mid-file), missing or extra blank lines, missing indices, numeric
+    # cue text and junk between blocks.
+    timing = None
+    cue_lines = []
+    match_timing = SRT_TIMING.match
+    for line in lines:
+        line = line.strip()
+        if line.startswith('\ufeff'):
+            line = line.lstrip('\ufeff')
+        match = match_timing(line) if '-->' in line else None
+        if match:
+            if timing is not None:
+                # No blank line before this block: a bare index belongs to it
+                if cue_lines and cue_lines[-1].isdigit():
+                    cue_lines.pop()
+                cue = _make_cue(timing, cue_lines)
+                if cue:
+                    yield cue
+            timing = match
+            cue_lines = []
+        elif not line:
+            if timing is not None and cue_lines:
+                cue = _make_cue(timing, cue_lines)
+                if cue:
+                    yield cue
+                timing = None
+                cue_lines = []
+        elif timing is not None:
+            cue_lines.append(line)
+    if timing is not None:
+        cue = _make_cue(timing, cue_lines)
+        if cue:
+            yield cue
+
+def iter_srt_cues(srt_path):
+    encoding = detect_encoding(srt_path)
+    with open(srt_path, 'r', encoding=encoding, errors='replace') as f:
+        yield from parse_srt_lines(f)
+
+class SrtTail:
+    # Incrementally parses an SRT file that ffmpeg is still writing: only
+    # blocks terminated by a blank line are parsed, the rest waits for the
+    # next read (or for final=True once the writer has exited).
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.pending = b""
+
+    def read_new(self, final=False):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read()
+        self.offset += len(data)
+        data = self.pending + data
+        if final:
+            cut = len(data)
+        else:
+            # Just past the last blank line; with none yet, everything stays pending
+            lf = data.rfind(b"\n\n")
+            crlf = data.rfind(b"\r\n\r\n")
+            cut = max(lf + 2 if lf >= 0 else 0, crlf + 4 if crlf >= 0 else 0)
+        complete, self.pending = data[:cut], data[cut:]
+        if not complete:
+            return []
+        return list(parse_srt_lines(complete.decode('utf-8', errors='replace').splitlines()))
+
+class CueTimeline:
+    # Sorted, array-backed cue index built once per subtitle file. Times live in
+    # parallel arrays and all cue texts share one string addressed by offsets.
+    # Lookups bisect on a running maximum of end times (so overlapping cues
+    # resolve to the earliest-starting active cue) and keep a cursor on the last
+    # hit so that normal forward playback resolves in O(1).
+    def __init__(self, cues=()):
+        self.starts = array('d')
+        self.ends = array('d')
+        self.text_starts = array('q')
+        self.text_ends = array('q')
+        self.max_ends = array('d')
+        self.buffer = ""
+        self.cursor = -1
+        self.extend(cues)
+
+    def extend(self, cues):
+        # Cues usually arrive in order (whole files, or a file being extracted),
+        # which only appends; anything out of order triggers a full re-sort.
+        # max_ends grows last, so concurrent lookups never see a half-added cue.
+        first = len(self.max_ends)
+        pieces = [self.buffer]
+        offset = len(self.buffer)
+        ordered = True
+        for cue in cues:
+            if self.starts and cue.start < self.starts[-1]:
+                ordered = False
+            self.starts.append(cue.start)
+            self.ends.append(cue.end)
+            self.text_starts.append(offset)
+            offset += len(cue.text)
+            self.text_ends.append(offset)
+            pieces.append(cue.text)
+        self.buffer = "".join(pieces)
+        if not ordered:
+            order = sorted(range(len(self.starts)), key=self.starts.__getitem__)
+            for name in ('starts', 'ends', 'text_starts', 'text_ends'):
+                values = getattr(self, name)
+                setattr(self, name, array(values.typecode, (values[i] for i in order)))
+            self.max_ends = array('d')
+            self.cursor = -1
+            first = 0
+        running_max = self.max_ends[-1] if self.max_ends else float('-inf')
+        for end in self.ends[first:]:
+            running_max = max(running_max, end)
+            self.max_ends.append(running_max)
+
+    def __len__(self):
+        return len(self.max_ends)
+
+    def __getitem__(self, idx):
+        return Cue(self.starts[idx], self.ends[idx], self.text(idx))
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def text(self, idx):
+        return self.buffer[self.text_starts[idx]:self.text_ends[idx]]
+
+    def _is_first_active(self, idx, t):
+        return (self.starts[idx] <= t <= self.ends[idx]
+                and (idx == 0 or self.max_ends[idx - 1] < t))
+
+    def find(self, t):
+        # Fast path: still on the cursor cue, or playback moved on to the next one
+        n = len(self.max_ends)
+        for idx in (self.cursor, self.cursor + 1):
+            if 0 <= idx < n and self._is_first_active(idx, t):
+                self.cursor = idx
+                return idx
+        # Slow path (seek, gap or overlap): first cue whose running end reaches t
+        idx = bisect_left(self.max_ends, t)
+        if idx < n and self.starts[idx] <= t:
+            self.cursor = idx
+            return idx
+        return -1
+
+    def text_at(self, t):
+        idx = self.find(t)
+        return self.text(idx) if idx >= 0 else ""
+
+    def reset_cursor(self):
+        self.cursor = -1
+
+def parse_batch_response(text):
+    # Accepts {"word": "translation", ...} or a list of {"word": ..., "translation": ...}
+    # objects; anything else yields an empty mapping so callers fall back to single words
+    try:
+        data = json.loads(text)
+    except (TypeError, ValueError):
+        return {}
+    return _translation_mapping(data)
+
+def parse_cue_response(text):
+    # {"gloss": "...", "words": {...}} -> {'gloss': str, 'words': {normalized word: translation}}
+    try:
+        data = json.loads(text)
+    except (TypeError, ValueError):
+        data = None
+    if not isinstance(data, dict):
+        return {'gloss': '', 'words': {}}
+    gloss = data.get('gloss')
+    return {
+        'gloss': gloss.strip() if isinstance(gloss, str) else '',
+        'words': _translation_mapping(data.get('words')),
+    }
+
+def _translation_mapping(data):
+    if isinstance(data, list):
+        data = {item.get("word"): item.get("translation") for item in data if isinstance(item, dict)}
+    if not isinstance(data, dict):
+        return {}
+    return {normalize_word(word): translation.strip() for word, translation in data.items()
+            if isinstance(word, str) and isinstance(translation, str) and translation.strip()}
+
+class TranslationCache:
+    # Two-tier translation cache keyed on (model, source language, canonical
+    # word): a bounded in-memory LRU in front of a SQLite table. The table is
+    # opened lazily by SQLite, so startup only pays for warming the LRU.
+    def __init__(self, db_path, max_entries=5000):
+        self.max_entries = max_entries
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "model TEXT NOT NULL, lang TEXT NOT NULL, word TEXT NOT NULL, "
+            "translation TEXT NOT NULL, PRIMARY KEY (model, lang, word))"
+        )
+        # One model response per cue: every word in context plus a gloss, as JSON
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS cue_translations ("
+            "model TEXT NOT NULL, lang TEXT NOT NULL, cue TEXT NOT NULL, "
+            "result TEXT NOT NULL, PRIMARY KEY (model, lang, cue))"
+        )
+        self.conn.commit()
+
+    def _remember(self, key, translation):
+        self.memory[key] = translation
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, model, lang, word, record=True):
+        # record=False lets background lookups (prefetch) leave the hit/miss counters alone
+        key = (model, lang, canonical_word(word))
+        with METRICS.timed("cache_lookup"), self.lock:
+            translation = self.memory.get(key)
+            if translation is not None:
+                self.memory.move_to_end(key)
+                self.hits += record
+                return translation
+            row = self.conn.execute(
+                "SELECT translation FROM translations WHERE model=? AND lang=? AND word=?", key
+            ).fetchone()
+            if row is not None:
+                self._remember(key, row[0])
+                self.hits += record
+                return row[0]
+            self.misses += record
+            return None
+
+    def put(self, model, lang, word, translation):
+        key = (model, lang, canonical_word(word))
+        with self.lock:
+            self._remember(key, translation)
+            self.conn.execute("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)", key + (translation,))
+            self.conn.commit()
+
+    def get_cue(self, model, lang, cue, record=True):
+        # Cue entries share the LRU with words; their 4-tuple keys cannot collide
+        key = (model, lang, cue_key(cue), 'cue')
+        with METRICS.timed("cache_lookup"), self.lock:
+            result = self.memory.get(key)
+            if result is not None:
+                self.memory.move_to_end(key)
+                self.hits += record
+                return result
+            row = self.conn.execute(
+                "SELECT result FROM cue_translations WHERE model=? AND lang=? AND cue=?", key[:3]
+            ).fetchone()
+            if row is not None:
+                result = json.loads(row[0])
+                self._remember(key, result)
+                self.hits += record
+                return result
+            self.misses += record
+            return None
+
+    def put_cue(self, model, lang, cue, result):
+        key = (model, lang, cue_key(cue), 'cue')
+        with self.lock:
+            self._remember(key, result)
+            self.conn.execute("INSERT OR REPLACE INTO cue_translations VALUES (?, ?, ?, ?)",
+                              key[:3] + (json.dumps(result, ensure_ascii=False),))
+            self.conn.commit()
+
+    def import_rows(self, model, lang, rows, replace=False):
+        # Seed the persistent tier from (word, translation) pairs without
+        # overwriting anything the model already answered, unless replace is
+        # set (translations the user corrected by hand). Only rows whose word
+        # is its own lemma are used: "fuimos" -> "We went." says nothing
+        # about what "ser" (or "ir") means on its own.
+        rows = [((model, lang, normalize_word(word)), translation) for word, translation in rows if word and translation]
+        rows = [(key, translation) for key, translation in rows if key[2] and canonical_word(key[2]) == key[2]]
+        with self.lock:
+            self.conn.executemany(
+                f"INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO translations VALUES (?, ?, ?, ?)",
+                (key + (translation,) for key, translation in rows),
+            )
+            self.conn.commit()
+            if replace:
+                for key, translation in rows:
+                    self._remember(key, translation)
+
+    def count(self, model, lang):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM translations WHERE model=? AND lang=?", (model, lang)
+            ).fetchone()[0]
+
+    def warm(self, model, lang, limit=None):
+        limit = self.max_entries if limit is None else limit
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT word, translation FROM translations WHERE model=? AND lang=? "
+                "ORDER BY rowid DESC LIMIT ?", (model, lang, limit)
+            ).fetchall()
+            for word, translation in reversed(rows):
+                self._remember((model, lang, word), translation)
+
+    def invalidate(self, model=None, persistent=False):
+        # Drop entries for one model (or everything). Persistent rows are keyed
+        # on the model as well, so they are only deleted when asked to.
+        with self.lock:
+            for key in [k for k in self.memory if model is None or k[0] == model]:
+                del self.memory[key]
+            if persistent:
+                for table in ("translations", "cue_translations"):
+                    if model is None:
+                        self.conn.execute(f"DELETE FROM {table}")
+                    else:
+                        self.conn.execute(f"DELETE FROM {table} WHERE model=?", (model,))
+                self.conn.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'memory_entries': len(self.memory),
+        }
+
+class TranslationJournal:
+    # Append-only JSONL log of saved translations. Deduplication runs against
+    # an in-memory index of known words, appends are handed to a writer thread
+    # that group-commits whatever arrived within `linger` seconds with a
+    # single fsync, and the Excel workbook is only written by export_xlsx().
+    # Rows are keyed on the surface word, not the lemma, so every form the
+    # user saved keeps its own row. A hand edit is logged as a "replace" record that overrides the earlier
+    # row for the same word when the journal is loaded.
+    def __init__(self, path, linger=0.2):
+        self.path = path
+        self.linger = linger
+        self.lock = threading.Lock()
+        self.rows = []
+        self.index = {}  # Normalized surface word -> position in rows
+        self.version = 0  # Bumped on every added or replaced row
+        self.exported_version = 0
+        self.queue = queue.SimpleQueue()
+        needs_newline = self.load()
+        self.file = open(self.path, 'a', encoding='utf-8')
+        if needs_newline:
+            self.file.write("\n")  # Terminate a line torn by a crash before appending
+        self.writer = threading.Thread(target=self._write_loop, name="journal-writer", daemon=True)
+        self.writer.start()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return False
+        line = ""
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    self._remember(entry['word'], entry['translation'], entry.get('sentence'),
+                                   replace=entry.get('replace', False))
+                except (ValueError, KeyError, TypeError):
+                    continue
+        return bool(line) and not line.endswith("\n")
+
+    def _remember(self, word, translation, sentence, replace=False):
+        if not isinstance(word, str) or not word.strip():
+            return False
+        key = normalize_word(word) or word.strip()  # A saved "-" or "..." row is kept too
+        position = self.index.get(key)
+        if position is None:
+            self.index[key] = len(self.rows)
+            self.rows.append((word, translation, sentence))
+        elif not replace or self.rows[position][1:] == (translation, sentence):
+            return False
+        else:
+            self.rows[position] = (word, translation, sentence)  # Keeps its place in the export
+        self.version += 1
+        return True
+
+    def __contains__(self, word):
+        return (normalize_word(word) or word.strip()) in self.index
+
+    def __len__(self):
+        return len(self.rows)
+
+    def append(self, word, translation, sentence, replace=False):
+        # replace=True overwrites a saved row for the same word instead of skipping it
+        with self.lock:
+            if not self._remember(word, translation, sentence, replace):
+                return False
+        entry = {'word': word, 'translation': translation, 'sentence': sentence}
+        if replace:
+            entry['replace'] = True
+        self.queue.put(json.dumps(entry, ensure_ascii=False))
+        return True
+
+    def _write_loop(self):
+        stop = False
+        while not stop:
+            line = self.queue.get()
+            if line is None:
+                break
+            lines = [line]
+            deadline = time.monotonic() + self.linger
+            while True:
+                try:
+                    line = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if line is None:
+                    stop = True
+                    break
+                lines.append(line)
+            with METRICS.timed("journal_write"):
+                self.file.write("".join(line + "\n" for line in lines))
+                self.file.flush()
+                os.fsync(self.file.fileno())
+        self.file.close()
+
+    def import_workbook(self, xlsx_path):
+        # The workbook wins: new words are added and edited rows replace the
+        # journal's. Returns the (word, translation) pairs that changed.
+        if not os.path.exists(xlsx_path):
+            return []
+        workbook = openpyxl.load_workbook(xlsx_path, read_only=True)
+        imported = []
+        for row in workbook.active.iter_rows(min_row=2, values_only=True):
+            if len(row) >= 2 and row[0] is not None:
+                word = str(row[0])
+                translation = "" if row[1] is None else str(row[1])
+                sentence = row[2] if len(row) > 2 else None
+                if self.append(word, translation, sentence, replace=True):
+                    imported.append((word, translation))
+        workbook.close()
+        return imported
+
+    @property
+    def dirty(self):
+        return self.version > self.exported_version
+
+    def mark_exported(self):
+        self.exported_version = self.version
+
+    def export_xlsx(self, xlsx_path):
+        # Written with a streaming workbook to a temp file, then swapped in, so a
+        # crash mid-export never leaves a half-written translations.xlsx
+        with self.lock:
+            rows = list(self.rows)
+            version = self.version
+        with METRICS.timed("excel_export"):
+            workbook = openpyxl.Workbook(write_only=True)
+            sheet = workbook.create_sheet("Translations")
+            sheet.append(["Original Word", "Translation", "Sentence"])
+            for row in rows:
+                sheet.append(list(row))
+            temp_path = f"{xlsx_path}.tmp"
+            workbook.save(temp_path)
+            os.replace(temp_path, xlsx_path)
+        os.utime(self.path)  # Keep the journal at least as new as its own export
+        self.exported_version = max(self.exported_version, version)
+        return len(rows)
+
+    def close(self):
+        self.queue.put(None)
+        self.writer.join()
+
+DEFAULT_MODEL = "gemma3:1b-it-qat"
+
+class TranslationTimeout(Exception):
+    pass
+
+class TranslationCancelled(Exception):
+    pass
+
+def translation_failed(translation):
+    # Failures come back as display text; they are never cached or logged as translations
+    return not translation or translation.startswith(("Error translating", "Timed out"))
+
+def ollama_address(host=None):
+    # Same forms as OLLAMA_HOST accepts: "host", "host:port", "http(s)://host:port"
+    host = host or os.environ.get("OLLAMA_HOST") or "127.0.0.1:11434"
+    parsed = urllib.parse.urlsplit(host if "://" in host else f"http://{host}")
+    hostname = parsed.hostname or "127.0.0.1"
+    if hostname == "0.0.0.0":
+        hostname = "127.0.0.1"
+    return parsed.scheme, hostname, parsed.port or (443 if parsed.scheme == "https" else 11434)
+
+class OllamaBackend:
+    # Ollama's HTTP API over a small pool of persistent (keep-alive)
+    # connections. At most max_concurrency requests are in flight; each one
+    # has a deadline, and cancel() aborts requests in flight by shutting their
+    # sockets down. keep_alive asks Ollama to keep the model loaded between
+    # requests, so only the first click after startup pays for loading it.
+    def __init__(self, host=None, keep_alive="30m", max_concurrency=2, timeout=30.0):
+        self.scheme, self.host, self.port = ollama_address(host)
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.lock = threading.Lock()
+        self.idle = []
+        self.active = {}  # connection -> thread that sent the request
+        self.cancelled = set()
+        self.closed = False
+
+    def generate(self, model, prompt, format=None, deadline=None):
+        payload = {"model": model, "prompt": prompt, "stream": False, "keep_alive": self.keep_alive}
+        if format:
+            payload["format"] = format
+        return self._post("/api/generate", payload, deadline or time.monotonic() + self.timeout)["response"]
+
+    def warm_up(self, model, timeout=300.0):
+        # A request without a prompt only loads the model
+        self._post("/api/generate", {"model": model, "keep_alive": self.keep_alive}, time.monotonic() + timeout)
+
+    def cancel(self, thread=None):
+        # Abort the requests in flight for one thread, or all of them
+        with self.lock:
+            for conn, owner in self.active.items():
+                if thread is None or owner is thread:
+                    self.cancelled.add(conn)
+                    if conn.sock is not None:
+                        try:
+                            conn.sock.shutdown(socket.SHUT_RDWR)
+                        except OSError:
+                            pass
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            idle, self.idle = self.idle, []
+        for conn in idle:
+            conn.close()
+        self.cancel()
+
+    def _checkout(self):
+        with self.lock:
+            if self.closed:
+                raise TranslationCancelled("backend closed")
+            conn = self.idle.pop() if self.idle else None
+            if conn is None:
+                connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+                conn = connection_class(self.host, self.port, timeout=self.timeout)
+            self.active[conn] = threading.current_thread()
+        return conn
+
+    def _release(self, conn, reuse):
+        # True if the request on this connection was cancelled
+        with self.lock:
+            del self.active[conn]
+            cancelled = conn in self.cancelled
+            self.cancelled.discard(conn)
+            if reuse and not cancelled and not self.closed:
+                self.idle.append(conn)
+                return False
+        conn.close()
+        return cancelled
+
+    def _post(self, path, payload, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TranslationTimeout("deadline already passed")
+        if not self.slots.acquire(timeout=remaining):
+            raise TranslationTimeout("no request slot freed up before the deadline")
+        try:
+            body = json.dumps(payload).encode('utf-8')
+            for attempt in range(2):
+                conn = self._checkout()
+                reused = conn.sock is not None
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining <= 0:
+                        raise TimeoutError()
+                    # The socket timeout bounds each blocking read; a non-streaming
+                    # reply arrives in one piece, so it is the request's deadline
+                    conn.timeout = remaining
+                    if reused:
+                        conn.sock.settimeout(remaining)
+                    conn.request("POST", path, body, {"Content-Type": "application/json"})
+                    response = conn.getresponse()
+                    data = response.read()
+                except TimeoutError:
+                    if self._release(conn, reuse=False):
+                        raise TranslationCancelled()
+                    raise TranslationTimeout(f"no answer from {self.host}:{self.port} before the deadline")
+                except (OSError, http.client.HTTPException):
+                    if self._release(conn, reuse=False):
+                        raise TranslationCancelled()
+                    if reused and attempt == 0:
+                        continue  # Ollama closed an idle keep-alive connection; retry on a fresh one
+                    raise
+                if self._release(conn, reuse=not response.will_close):
+                    raise TranslationCancelled()
+                if response.status != 200:
+                    raise RuntimeError(f"Ollama returned {response.status}: {data[:200].decode('utf-8', 'replace')}")
+                return json.loads(data)
+        finally:
+            self.slots.release()
+
+class StubBackend:
+    # Deterministic stand-in for the model, for benchmarks and trying the UI
+    # without Ollama: every word translates to "<word> (en)". Requests are
+    # served one at a time, after request_overhead plus per_token per
+    # generated token, like a single loaded model.
+    def __init__(self, request_overhead=0.0, per_token=0.0):
+        self.request_overhead = request_overhead
+        self.per_token = per_token
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    @staticmethod
+    def translate(word):
+        return f"{word} (en)"
+
+    def respond(self, prompt, format=None):
+        # (response text, generated tokens) for the prompts Translator sends
+        if format == "json":
+            words = json.loads(prompt.split("Words:", 1)[1])
+            mapping = {word: self.translate(word) for word in words}
+            if '"gloss"' in prompt:
+                gloss = " ".join(mapping.values())
+                return json.dumps({"gloss": gloss, "words": mapping}, ensure_ascii=False), 8 * len(words)
+            return json.dumps(mapping, ensure_ascii=False), 6 * len(words)
+        match = re.search(r"'([^']+)'", prompt)
+        return self.translate(match.group(1) if match else prompt), 3
+
+    def generate(self, model, prompt, format=None, deadline=None):
+        text, tokens = self.respond(prompt, format)
+        with self.lock:
+            self.requests += 1
+            delay = self.request_overhead + tokens * self.per_token
+            if deadline is not None and time.monotonic() + delay > deadline:
+                time.sleep(max(0.0, deadline - time.monotonic()))
+                raise TranslationTimeout("stub deadline")
+            time.sleep(delay)
+        return text
+
+    def warm_up(self, model):
+        pass
+
+    def cancel(self, thread=None):
+        pass
+
+    def close(self):
+        pass
+
+class Translator:
+    # Every model call goes through self.backend (OllamaBackend, or
+    # StubBackend for benchmarks) and is bounded by `timeout` seconds in total,
+    # fallbacks included: a slow or cold model yields a "Timed out" message
+    # instead of a placeholder that never resolves.
+    def __init__(self, model=DEFAULT_MODEL, source_language="es", cache=None, backend=None, timeout=30.0):
+        self.model = model
+        self.source_language = source_language
+        self.cache = cache
+        self.backend = backend or OllamaBackend(timeout=timeout)
+        self.timeout = timeout
+
+    def set_model(self, model):
+        if model != self.model and self.cache:
+            self.cache.invalidate(self.model)
+        self.model = model
+        if self.cache:
+            self.cache.warm(self.model, self.source_language)
+
+    def warm_up(self):
+        try:
+            self.backend.warm_up(self.model)
+        except Exception as e:
+            log.warning("Could not load model %s: %s", self.model, e)
+
+    def cancel(self, thread=None):
+        self.backend.cancel(thread)
+
+    def close(self):
+        self.backend.close()
+
+    def deadline(self):
+        return time.monotonic() + self.timeout
+
+    def _generate(self, prompt, deadline, **options):
+        with METRICS.timed("model_request"):
+            return self.backend.generate(self.model, prompt, deadline=deadline, **options)
+
+    def cached_translation(self, word, record=True):
+        if not self.cache:
+            return None
+        return self.cache.get(self.model, self.source_language, word, record=record)
+
+    def translate_word(self, word, deadline=None, record=True):
+        # Inflected forms share their lemma's entry, so the lemma is what gets translated
+        word = canonical_word(word)
+        if self.cache:
+            cached = self.cache.get(self.model, self.source_language, word, record=record)
+            if cached is not None:
+                return cached
+        return self._translate_uncached(word, deadline)
+
+    def _translate_uncached(self, word, deadline=None):
+        # word is already canonical and known to be missing from the cache
+        log.debug("Attempting to translate: %s", word)
+        try:
+            prompt = f"Translate the Spanish word '{word}' to English. Provide only the translated word or a short phrase."
+            translated_text = self._generate(prompt, deadline or self.deadline()).strip()
+            log.debug("Translated %r to: %s", word, translated_text)
+        except TranslationCancelled:
+            raise
+        except TranslationTimeout as e:
+            log.warning("Timed out translating %r: %s", word, e)
+            return f"Timed out: the model did not answer within {self.timeout:g} s"
+        except Exception as e:
+            log.warning("Error translating %r: %s", word, e)
+            return f"Error translating: {str(e)}"
+        if self.cache and translated_text:
+            self.cache.put(self.model, self.source_language, word, translated_text)
+        return translated_text
+
+    def cached_in_context(self, word, cue, record=True):
+        # (translation, gloss) from the cue's cached response, or None
+        if not self.cache or not cue:
+            return None
+        result = self.cache.get_cue(self.model, self.source_language, cue, record=record)
+        if result is None:
+            return None
+        translation = result['words'].get(normalize_word(word))
+        return (translation, result['gloss']) if translation else None
+
+    def translate_cue(self, cue, record=True, deadline=None):
+        # One request per cue that covers every word of the line in context,
+        # plus a gloss of the whole line. Returns None if the model failed.
+        cue = cue_key(cue)
+        if self.cache:
+            cached = self.cache.get_cue(self.model, self.source_language, cue, record=record)
+            if cached is not None:
+                return cached
+        words = list(dict.fromkeys(key for _, key in subtitle_words(cue) if key))
+        if not words:
+            return None
+        log.debug("Attempting to translate cue: %s", cue)
+        try:
+            prompt = (
+                f"Here is a line of Spanish dialogue: {json.dumps(cue, ensure_ascii=False)}\n"
+                "Respond with a JSON object with two keys: \"gloss\", a natural English "
+                "translation of the whole line, and \"words\", an object that maps every "
+                "word below, exactly as given, to its English meaning in this line "
+                "(a word or a short phrase).\n"
+                f"Words: {json.dumps(words, ensure_ascii=False)}"
+            )
+            result = parse_cue_response(self._generate(prompt, deadline or self.deadline(), format="json"))
+        except TranslationCancelled:
+            raise
+        except Exception as e:
+            log.warning("Error translating cue %r: %s", cue, e)
+            return None
+        if self.cache and result['words']:
+            self.cache.put_cue(self.model, self.source_language, cue, result)
+        return result
+
+    def translate_in_context(self, word, cue, record=True):
+        # (translation, gloss); words the cue response missed fall back to a bare
+        # request, within the same deadline
+        deadline = self.deadline()
+        result = self.translate_cue(cue, record=record, deadline=deadline) if cue else None
+        translation = result['words'].get(normalize_word(word)) if result else None
+        if translation:
+            return translation, result['gloss']
+        return self.translate_word(word, deadline, record=record), result['gloss'] if result else ''
+
+    def translate_words(self, words, record=True, deadline=None):
+        # One structured request for the whole list, mapped back per canonical
+        # word. Words the model leaves out (or an unparseable reply) fall back
+        # to single-word requests, within the same deadline.
+        deadline = deadline or self.deadline()
+        results = {}
+        missing = []
+        for word in words:
+            key = canonical_word(word)
+            if not key or key in results or key in missing:
+                continue
+            cached = self.cached_translation(key, record=record)
+            if cached is not None:
+                results[key] = cached
+            else:
+                missing.append(key)
+        # Misses were just looked up (and counted), so fallbacks go straight to the model
+        if len(missing) == 1:
+            results[missing[0]] = self._translate_uncached(missing[0], deadline)
+            return results
+        answered = {}
+        if missing:
+            log.debug("Attempting to translate batch: %s", missing)
+            try:
+                prompt = (
+                    "Translate each of the following Spanish words to English. "
+                    "Respond with a JSON object that maps every word, exactly as given, "
+                    "to its English translation (a word or a short phrase).\n"
+                    f"Words: {json.dumps(missing, ensure_ascii=False)}"
+                )
+                answered = parse_batch_response(self._generate(prompt, deadline, format="json"))
+            except TranslationCancelled:
+                raise
+            except Exception as e:
+                log.warning("Error translating batch, falling back to single words: %s", e)
+        for key in missing:
+            translation = answered.get(key)
+            if translation:
+                results[key] = translation
+                if self.cache:
+                    self.cache.put(self.model, self.source_language, key, translation)
+            else:
+                results[key] = self._translate_uncached(key, deadline)
+        return results
+
+class BackgroundWorker:
+    # Runs blocking jobs (model requests, workbook writes) on a thread pool and
+    # hands the results back to the Tk thread. Worker threads never touch Tk:
+    # they only put finished futures on a queue, which the Tk side drains via
+    # root.after while jobs are in flight.
+    def __init__(self, root, max_workers=2, name="worker", poll_ms=15):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self.results = queue.SimpleQueue()
+        self.pending = 0
+        self.poll_job = None
+
+    def submit(self, fn, *args, callback=None, errback=None):
+        self.pending += 1
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(lambda f: self.results.put((callback, errback, f)))
+        if self.poll_job is None:
+            self.poll_job = self.root.after(self.poll_ms, self._drain)
+        return future
+
+    def _drain(self):
+        self.poll_job = None
+        while True:
+            try:
+                callback, errback, future = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            try:
+                if future.exception() is not None and errback:
+                    errback(future.exception())
+                    continue
+                result = future.result()
+                if callback:
+                    callback(result)
+            except Exception as e:
+                log.exception("Background job failed: %s", e)
+        if self.pending:
+            self.poll_job = self.root.after(self.poll_ms, self._drain)
+
+    def shutdown(self, wait=True):
+        if self.poll_job is not None:
+            self.root.after_cancel(self.poll_job)
+            self.poll_job = None
+        self.executor.shutdown(wait=wait, cancel_futures=not wait)
+
+class PrefetchScheduler:
+    # Warms the translation cache with the vocabulary of the cues just ahead of
+    # the playhead, so a click usually finds its word already translated.
+    # Batches run one at a time on a dedicated thread, are rate-limited, and
+    # back off entirely while an interactive request is in flight. A seek bumps
+    # the generation, which abandons whatever was queued for the old position.
+    def __init__(self, translator, is_busy=lambda: False, lookahead_seconds=30.0,
+                 lookahead_cues=10, batch_size=8, words_per_second=4.0, by_cue=False):
+        self.translator = translator
+        self.by_cue = by_cue  # Warm whole-cue context results instead of single words
+        self.is_busy = is_busy
+        self.lookahead_seconds = lookahead_seconds
+        self.lookahead_cues = lookahead_cues
+        self.batch_size = batch_size
+        self.min_interval = 1.0 / words_per_second
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+        self.lock = threading.Lock()
+        self.pending = deque()
+        self.queued = set()
+        self.prefetched = set()
+        self.next_cue = 0
+        self.generation = 0
+        self.running = False
+        self.worker = None  # Thread running the current batch, so reset() can cancel its request
+        self.next_request = 0.0
+        # Counters
+        self.words_prefetched = 0
+        self.clicks = 0
+        self.prefetch_hits = 0
+
+    def on_tick(self, timeline, current_time):
+        if not len(timeline):
+            return
+        idx = timeline.find(current_time)
+        if idx < 0:
+            idx = bisect_left(timeline.starts, current_time)
+        with self.lock:
+            # Both limits are measured from the playhead; cues already queued are skipped
+            playhead = idx
+            idx = max(idx, self.next_cue)
+            horizon = current_time + self.lookahead_seconds
+            while idx < len(timeline) and idx - playhead < self.lookahead_cues and timeline.starts[idx] <= horizon:
+                if self.by_cue:
+                    keys = [cue_key(timeline.text(idx))]
+                else:
+                    keys = [canonical_word(key) for _, key in subtitle_words(timeline.text(idx))]
+                for key in keys:
+                    if key and key not in self.queued:
+                        self.queued.add(key)
+                        self.pending.append(key)
+                idx += 1
+            self.next_cue = idx
+        self._pump()
+
+    def _pump(self):
+        with self.lock:
+            if self.running or not self.pending:
+                return
+            batch = [self.pending.popleft() for _ in range(min(self.batch_size, len(self.pending)))]
+            self.running = True
+            generation = self.generation
+        self.executor.submit(self._run_batch, generation, batch)
+
+    def _wait_for_turn(self, generation):
+        while generation == self.generation:
+            if self.is_busy():
+                time.sleep(0.05)
+                continue
+            delay = self.next_request - time.monotonic()
+            if delay <= 0:
+                return True
+            time.sleep(delay)
+        return False
+
+    def _run_batch(self, generation, batch):
+        self.worker = threading.current_thread()
+        if self.by_cue:
+            self._run_cues(generation, batch)
+            return
+        try:
+            missing = [word for word in batch if self.translator.cached_translation(word, record=False) is None]
+            if missing and self._wait_for_turn(generation):
+                self.next_request = time.monotonic() + self.min_interval * len(missing)
+                for word, translation in self.translator.translate_words(missing, record=False).items():
+                    if not translation_failed(translation):
+                        self.prefetched.add(word)
+                        self.words_prefetched += 1
+        except TranslationCancelled:
+            pass  # A seek abandoned this batch
+        finally:
+            with self.lock:
+                self.running = False
+        self._pump()
+
+    def _run_cues(self, generation, cues):
+        try:
+            for cue in cues:
+                if self.translator.cache and self.translator.cache.get_cue(
+                        self.translator.model, self.translator.source_language, cue, record=False) is not None:
+                    continue
+                if not self._wait_for_turn(generation):
+                    break
+                self.next_request = time.monotonic() + self.min_interval * len(cue.split())
+                if self.translator.translate_cue(cue, record=False) is not None:
+                    self.prefetched.add(cue)
+                    self.words_prefetched += len(cue.split())
+        except TranslationCancelled:
+            pass
+        finally:
+            with self.lock:
+                self.running = False
+        self._pump()
+
+    def set_by_cue(self, by_cue):
+        self.reset()
+        self.by_cue = by_cue
+
+    def record_click(self, key, was_cached):
+        # key is the clicked word's cache key, or the cue_key() of its line in cue mode
+        self.clicks += 1
+        if was_cached and key in self.prefetched:
+            self.prefetch_hits += 1
+
+    def reset(self):
+        # Called on seeks and new subtitle files; the next tick requeues from the playhead
+        with self.lock:
+            self.generation += 1
+            self.pending.clear()
+            self.queued.clear()
+            self.next_cue = 0
+            in_flight = self.worker if self.running else None
+        if in_flight is not None:
+            # Don't keep the model busy with words from the old position
+            self.translator.cancel(in_flight)
+
+    def stats(self):
+        return {
+            'words_prefetched': self.words_prefetched,
+            'clicks': self.clicks,
+            'prefetch_hits': self.prefetch_hits,
+            'prefetch_hit_rate': self.prefetch_hits / self.clicks if self.clicks else 0.0,
+            'pending': len(self.pending),
+        }
+
+    def shutdown(self):
+        self.reset()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+# Codecs ffmpeg can convert to SRT; image-based tracks (PGS, VobSub) cannot be
+TEXT_SUBTITLE_CODECS = {'subrip', 'srt', 'ass', 'ssa', 'mov_text', 'webvtt', 'text'}
+
+def default_cache_dir():
+    base = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'subtitle_translator')
+
+def probe_subtitle_streams(video_file):
+    # Returns (subtitle streams, container duration in seconds or None)
+    cmd = [
+        "ffprobe", "-v", "error", "-select_streams", "s",
+        "-show_entries", "stream=index,codec_name:stream_tags=language,title:format=duration",
+        "-of", "json", video_file
+    ]
+    with METRICS.timed("ffprobe"):
+        result = subprocess.run(cmd, stderr=subprocess.PIPE, stdout=subprocess.PIPE, text=True, check=True)
+    info = json.loads(result.stdout or "{}")
+    try:
+        duration = float(info.get("format", {}).get("duration"))
+    except (TypeError, ValueError):
+        duration = None
+    streams = []
+    for stream in info.get("streams", []):
+        tags = stream.get("tags", {})
+        streams.append({
+            'index': stream['index'],
+            'codec': stream.get('codec_name', ''),
+            'language': tags.get('language', ''),
+            'title': tags.get('title', ''),
+        })
+    return streams, duration
+
+class SubtitleCache:
+    # Content-addressed store for extracted subtitle tracks. Entries are keyed
+    # by file identity (size, mtime and a hash of the first and last MiB), so a
+    # reopened video skips both the probe and the demux. All missing text
+    # tracks are pulled out in a single ffmpeg pass. Each pass writes to its
+    # own partial files (named after a run id), so a cancelled ffmpeg that is
+    # still flushing can never write into the next pass's output.
+    SAMPLE_BYTES = 1 << 20
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.runs = itertools.count()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def new_run(self):
+        return f"{os.getpid()}-{next(self.runs)}"
+
+    def key(self, video_file):
+        stat = os.stat(video_file)
+        digest = hashlib.sha1(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+        with open(video_file, 'rb') as f:
+            digest.update(f.read(self.SAMPLE_BYTES))
+            if stat.st_size > 2 * self.SAMPLE_BYTES:
+                f.seek(-self.SAMPLE_BYTES, os.SEEK_END)
+                digest.update(f.read(self.SAMPLE_BYTES))
+        return digest.hexdigest()
+
+    def track_path(self, key, stream):
+        return os.path.join(self.directory, f"{key}_{stream['index']}.srt")
+
+    def probe(self, video_file, key):
+        # Returns {'streams': [text subtitle streams], 'duration': seconds or None}
+        probe_path = os.path.join(self.directory, f"{key}_probe.json")
+        if os.path.exists(probe_path):
+            with open(probe_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        streams, duration = probe_subtitle_streams(video_file)
+        probe = {'streams': [s for s in streams if s['codec'] in TEXT_SUBTITLE_CODECS], 'duration': duration}
+        with open(f"{probe_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(probe, f)
+        os.replace(f"{probe_path}.tmp", probe_path)
+        return probe
+
+    def extract_command(self, video_file, key, streams, run):
+        cmd = ["ffmpeg", "-y", "-v", "error", "-i", video_file]
+        for stream in streams:
+            cmd += ["-map", f"0:{stream['index']}", "-c:s", "srt", self.partial_path(key, stream, run)]
+        return cmd
+
+    def partial_path(self, key, stream, run):
+        return self.track_path(key, stream)[:-len(".srt")] + f".{run}.partial.srt"
+
+    def commit(self, key, streams, run):
+        # Only complete outputs are moved into place, so an interrupted run is redone next time
+        for stream in streams:
+            partial = self.partial_path(key, stream, run)
+            if os.path.exists(partial):
+                os.replace(partial, self.track_path(key, stream))
+
+    def discard(self, key, streams, run):
+        for stream in streams:
+            try:
+                os.remove(self.partial_path(key, stream, run))
+            except FileNotFoundError:
+                pass
+
+    def missing(self, key, streams):
+        return [s for s in streams if not os.path.exists(self.track_path(key, s))]
+
+    def extract(self, video_file, key, streams):
+        missing = self.missing(key, streams)
+        if missing:
+            run = self.new_run()
+            try:
+                with METRICS.timed("ffmpeg_extract"):
+                    subprocess.run(self.extract_command(video_file, key, missing, run), stderr=subprocess.PIPE, stdout=subprocess.PIPE, text=True, check=True)
+                self.commit(key, missing, run)
+            finally:
+                self.discard(key, missing, run)  # Leftovers of a failed run
+        return {s['index']: self.track_path(key, s) for s in streams}
+
+class ExtractionJob:
+    # A managed ffmpeg run. `-progress pipe:1` is parsed on a reader thread into
+    # out_time; the Tk side only polls attributes and may cancel at any time.
+    # After a cancel, on_cancelled runs on the reader thread once ffmpeg has
+    # actually exited (it flushes its outputs on SIGTERM).
+    def __init__(self, cmd, duration=None, on_cancelled=None):
+        self.cmd = cmd[:1] + ["-nostats", "-progress", "pipe:1"] + cmd[1:]
+        self.duration = duration
+        self.on_cancelled = on_cancelled
+        self.out_time = 0.0
+        self.process = None
+        self.returncode = None
+        self.cancelled = False
+        self.error = ""
+        self.error_tail = deque(maxlen=20)  # Last lines of stderr, for the failure message
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.process = subprocess.Popen(self.cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                        errors='replace')
+        # stderr gets its own reader: a damaged stream can log an error per
+        # packet, and a full stderr pipe would stall ffmpeg (and stdout) for good
+        self.error_reader = threading.Thread(target=self._read_errors, name="ffmpeg-stderr", daemon=True)
+        self.error_reader.start()
+        threading.Thread(target=self._read_progress, name="ffmpeg-progress", daemon=True).start()
+        return self
+
+    def _read_errors(self):
+        for line in self.process.stderr:
+            if line.strip():
+                self.error_tail.append(line.rstrip())
+
+    def _read_progress(self):
+        for line in self.process.stdout:
+            key, _, value = line.strip().partition('=')
+            # out_time_ms is in microseconds too (a long-standing ffmpeg quirk)
+            if key in ('out_time_us', 'out_time_ms') and value.isdigit():
+                self.out_time = int(value) / 1e6
+        returncode = self.process.wait()
+        self.error_reader.join()
+        self.error = "\n".join(self.error_tail)
+        self.returncode = returncode  # Last, so `running` only turns false once error is set
+        if self.cancelled:
+            if self.on_cancelled is not None:
+                self.on_cancelled()
+        elif self.returncode == 0:
+            METRICS.record("ffmpeg_extract", time.perf_counter() - self.started)
+
+    @property
+    def running(self):
+        return self.process is not None and self.returncode is None
+
+    @property
+    def fraction(self):
+        if not self.duration:
+            return None
+        return min(1.0, self.out_time / self.duration)
+
+    def cancel(self):
+        self.cancelled = True
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+
+def describe_stream(position, stream):
+    language = f" ({stream['language']})" if stream['language'] else ""
+    title = f" - {stream['title']}" if stream['title'] else ""
+    return f"Track {position}: Stream 0:{stream['index']}{language} {stream['codec']}{title}"
+
+class PlayerState:
+    # Event-driven mirror of the VLC player's state. libVLC fires events on its
+    # own threads, which must not touch Tk: even event_generate blocks there
+    # until the Tk thread answers, and deadlocks against player.stop() or
+    # set_media(), which wait on that same VLC thread. Callbacks only queue the
+    # change, and the Tk side drains the queue via root.after, coalescing
+    # bursts into one on_change(kinds) call. The poll runs while playing, and
+    # after each player command until VLC reports its outcome (see wake());
+    # an idle or paused player costs nothing.
+    PLAYED = ('playing', 'stopped', 'ended', 'error')
+    PAUSED = ('paused', 'stopped', 'ended', 'error')
+    STOPPED = ('stopped', 'error')
+    SEEKED = ('time', 'stopped', 'ended', 'error')
+
+    def __init__(self, root, player, on_change, poll_ms=40, max_wait_seconds=30.0):
+        self.root = root
+        self.on_change = on_change
+        self.poll_ms = poll_ms
+        self.max_wait_seconds = max_wait_seconds
+        self.time_ms = 0
+        self.length_ms = 0
+        self.playing = False
+        self.parsed = False
+        self.queue = queue.SimpleQueue()
+        self.poll_job = None
+        self.expecting = set()  # Event kinds that would answer the last command
+        self.awake_until = 0.0
+        events = player.event_manager()
+        for event_type, kind in (
+            (vlc.EventType.MediaPlayerTimeChanged, 'time'),
+            (vlc.EventType.MediaPlayerLengthChanged, 'length'),
+            (vlc.EventType.MediaPlayerPlaying, 'playing'),
+            (vlc.EventType.MediaPlayerPaused, 'paused'),
+            (vlc.EventType.MediaPlayerStopped, 'stopped'),
+            (vlc.EventType.MediaPlayerEndReached, 'ended'),
+            (vlc.EventType.MediaPlayerEncounteredError, 'error'),
+        ):
+            events.event_attach(event_type, self._post, kind)
+
+    def attach_media(self, media):
+        self.time_ms = 0
+        self.length_ms = 0
+        self.parsed = False
+        media.event_manager().event_attach(vlc.EventType.MediaParsedChanged, self._post, 'parsed')
+
+    def _post(self, event, kind):
+        # VLC thread: read the payload now, the event object does not outlive the callback
+        if kind == 'time':
+            value = event.u.new_time
+        elif kind == 'length':
+            value = event.u.new_length
+        else:
+            value = None
+        self.queue.put((kind, value))
+
+    def wake(self, expect):
+        # Tk thread, after play/pause/stop/seek/load: poll until one of the
+        # `expect` kinds arrives (opening a large file over a network share can
+        # take a while), giving up after max_wait_seconds
+        self.expecting = set(expect)
+        self.awake_until = time.monotonic() + self.max_wait_seconds
+        if self.poll_job is None:
+            self.poll_job = self.root.after(self.poll_ms, self._drain)
+
+    def _drain(self):
+        self.poll_job = None
+        kinds = set()
+        while True:
+            try:
+                kind, value = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'time':
+                self.time_ms = value
+            elif kind == 'length':
+                self.length_ms = value
+            elif kind == 'playing':
+                self.playing = True
+            elif kind in ('paused', 'stopped', 'ended', 'error'):
+                self.playing = False
+            elif kind == 'parsed':
+                self.parsed = True
+            kinds.add(kind)
+        if kinds & self.expecting:
+            self.expecting = set()
+        if kinds:
+            self.on_change(kinds)
+        waiting = self.expecting and time.monotonic() < self.awake_until
+        if self.poll_job is None and (self.playing or waiting):
+            self.poll_job = self.root.after(self.poll_ms, self._drain)
+
+    def close(self):
+        if self.poll_job is not None:
+            self.root.after_cancel(self.poll_job)
+            self.poll_job = None
+
+    def seeked(self, time_ms):
+        # Our own seeks take effect immediately, before VLC reports the new time
+        self.time_ms = time_ms
+
+class OverlayLine:
+    __slots__ = ('frame', 'right_spacer', 'labels', 'packed')
+
+    def __init__(self, frame, right_spacer):
+        self.frame = frame
+        self.right_spacer = right_spacer
+        self.labels = []
+        self.packed = 0  # Number of labels currently packed into this line
+
+class SubtitleOverlay:
+    # Retained-mode renderer for the clickable subtitle words. Line frames and
+    # word labels come from pools that only grow (event bindings are made once
+    # per label), fonts and word widths are cached per font size, and a render
+    # only touches the lines whose words actually changed.
+    BG = "#222222"
+    HOVER_BG = "#444444"
+    PADX = 4
+
+    def __init__(self, frame, on_word_click, family="Segoe UI"):
+        self.frame = frame
+        self.on_word_click = on_word_click
+        self.family = family
+        self.fonts = {}
+        self.widths = OrderedDict()  # font size -> {word: display width}
+        self.wrapped = OrderedDict()  # (text, font size, width) -> line breaks
+        self.max_wrapped = 256
+        self.lines = []
+        self.layout = []  # Words currently shown, one tuple of (word, clean_word) per line
+        self.label_words = {}
+        self.font_size = None
+
+    def font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = tkinter.font.Font(family=self.family, size=size, weight="bold")
+        return font
+
+    def measure(self, word, size):
+        widths = self.widths.get(size)
+        if widths is None:
+            widths = self.widths[size] = {}
+            if len(self.widths) > 4:
+                self.widths.popitem(last=False)
+        width = widths.get(word)
+        if width is None:
+            # Word width including its own padx on both sides
+            width = widths[word] = self.font(size).measure(word) + 2 * self.PADX
+        return width
+
+    def wrap(self, text, size, max_width):
+        lines = []
+        line = []
+        line_width = 0
+        for word, clean_word in subtitle_words(text):
+            width = self.measure(word, size)
+            if line and line_width + width > max_width:
+                lines.append(tuple(line))
+                line = []
+                line_width = 0
+            line.append((word, clean_word))
+            line_width += width
+        if line:
+            lines.append(tuple(line))
+        return lines
+
+    def wrap_cached(self, text, size, max_width):
+        key = (text, size, max_width)
+        lines = self.wrapped.get(key)
+        if lines is None:
+            lines = self.wrapped[key] = self.wrap(text, size, max_width)
+            if len(self.wrapped) > self.max_wrapped:
+                self.wrapped.popitem(last=False)
+        else:
+            self.wrapped.move_to_end(key)
+        return lines
+
+    def render(self, text, size, max_width):
+        lines = self.wrap_cached(text, size, max_width) if text else []
+        if size != self.font_size:
+            self.font_size = size
+            font = self.font(size)
+            for line in self.lines:
+                for label in line.labels:
+                    label.config(font=font)
+        for idx, words in enumerate(lines):
+            if idx < len(self.layout) and self.layout[idx] == words:
+                continue
+            self._fill_line(idx, words, shown=idx < len(self.layout))
+        for line in self.lines[len(lines):len(self.layout)]:
+            line.frame.pack_forget()
+        self.layout = lines
+
+    def _fill_line(self, idx, words, shown):
+        if idx == len(self.lines):
+            self.lines.append(self._new_line())
+        line = self.lines[idx]
+        for pos, (word, clean_word) in enumerate(words):
+            if pos == len(line.labels):
+                line.labels.append(self._new_label(line.frame))
+            label = line.labels[pos]
+            if label.cget("text") != word:
+                label.config(text=word)
+            self.label_words[label] = clean_word
+            if pos >= line.packed:
+                label.pack(side=tk.LEFT, padx=self.PADX, pady=2, before=line.right_spacer)
+        for label in line.labels[len(words):line.packed]:
+            label.pack_forget()
+        line.packed = len(words)
+        if not shown:
+            line.frame.pack(fill=tk.X, expand=True, pady=5)
+
+    def _new_line(self):
+        frame = tk.Frame(self.frame, bg=self.BG, highlightthickness=0)
+        tk.Frame(frame, bg=self.BG).pack(side=tk.LEFT, expand=True)  # Left spacer
+        right_spacer = tk.Frame(frame, bg=self.BG)
+        right_spacer.pack(side=tk.RIGHT, expand=True)
+        return OverlayLine(frame, right_spacer)
+
+    def _new_label(self, parent):
+        label = tk.Label(
+            parent,
+            font=self.font(self.font_size),
+            bg=self.BG,
+            fg="#fff",
+            bd=0,
+            relief="flat",
+            highlightthickness=0,
+            cursor="hand2"
+        )
+        label.bind("<Button-1>", lambda e, l=label: self.on_word_click(self.label_words[l], l))
+        label.bind("<Enter>", lambda e, l=label: l.config(bg=self.HOVER_BG))
+        label.bind("<Leave>", lambda e, l=label: l.config(bg=self.BG))
+        return label
+
+    def shows(self, label, clean_word):
+        # Pooled labels get reused, so check that the label still shows the word
+        return self.label_words.get(label) == clean_word and label.winfo_ismapped()
 
 class SubtitleTranslatorApp:
-    def __init__(self, root):
+    def __init__(self, root, metrics_file=None, model=DEFAULT_MODEL, backend=None, timeout=30.0):
         self.root = root
         self.root.title("Subtitle Translator with Embedded Subtitles")
         self.root.geometry("1000x700")
@@ -40,6 +1937,7 @@ class SubtitleTranslatorApp:
         self.subtitle_overlay.place(relx=0.5, rely=0.85, anchor="center", relwidth=0.9)
         self.subtitle_overlay.config(padx=20, pady=10)
         self.last_subtitle_text = None  # Track last subtitle to prevent flicker
+        self.overlay_renderer = SubtitleOverlay(self.subtitle_overlay, self.handle_word_click_gui_pause)
 
         # Bind spacebar and canvas click for resume
         self.root.bind('<space>', lambda e: self.resume_video())
@@ -60,7 +1958,7 @@ class SubtitleTranslatorApp:
         self.stop_btn.grid(row=0, column=1, padx=5)
 
         self.seek_var = tk.DoubleVar()
-        self.seek_bar = tk.Scale(self.player_controls_frame, from_=0, to=100, orient=tk.HORIZONTAL, variable=self.seek_var, showvalue=0, length=400, command=self.seek_video, bg="#f4f4f4", highlightthickness=0)
+        self.seek_bar = tk.Scale(self.player_controls_frame, from_=0, to=100, orient=tk.HORIZONTAL, variable=self.seek_var, showvalue=0, resolution=0.1, length=400, command=self.seek_video, bg="#f4f4f4", highlightthickness=0)
         self.seek_bar.grid(row=0, column=2, padx=10)
 
         self.time_label = tk.Label(self.player_controls_frame, text="00:00 / 00:00", font=("Segoe UI", 10), bg="#f4f4f4")
@@ -73,59 +1971,141 @@ class SubtitleTranslatorApp:
         self.load_button.grid(row=0, column=0, padx=5)
         self.load_subs_button = tk.Button(self.load_controls_frame, text="Load Subtitles", command=self.load_subtitles, font=("Segoe UI", 11), bg="#e0e0e0", relief="flat", padx=10, pady=5)
         self.load_subs_button.grid(row=0, column=1, padx=5)
+        self.export_button = tk.Button(self.load_controls_frame, text="Export to Excel", command=self.export_translations, font=("Segoe UI", 11), bg="#e0e0e0", relief="flat", padx=10, pady=5)
+        self.export_button.grid(row=0, column=2, padx=5)
+        # Translate clicked words together with their subtitle line (one cached model call per line)
+        self.context_var = tk.BooleanVar(value=True)
+        self.context_check = tk.Checkbutton(self.load_controls_frame, text="Translate in context", variable=self.context_var, command=self.toggle_context_mode, font=("Segoe UI", 11), bg="#f4f4f4")
+        self.context_check.grid(row=0, column=3, padx=5)
 
         self.status_label = tk.Label(self.root, text="", font=("Segoe UI", 11), bg="#f4f4f4", fg="#333")
         self.status_label.pack(pady=5)
+        # Shown only while subtitles are being extracted
+        self.progress_bar = ttk.Progressbar(self.root, orient=tk.HORIZONTAL, mode="determinate", maximum=100, length=300)
 
         # Subtitle data
-        self.subtitles = []
+        self.subtitles = CueTimeline()
         self.current_subtitle_index = -1
         self.subtitle_tracks = []
         self.selected_track = None
+        self.subtitle_cache = SubtitleCache(default_cache_dir())
+        self.video_generation = 0  # Bumped per loaded video or .srt so late probe/parse results are dropped
+        self.extraction = None
+        self.extraction_poll_job = None
 
-        # VLC event manager
-        self.event_manager = self.player.event_manager()
-        self.event_manager.event_attach(vlc.EventType.MediaPlayerTimeChanged, self.update_subtitles)
-
-        # Ollama model
-        self.ollama_model = "gemma3:1b-it-qat"  # Change to your preferred model
+        # VLC events, delivered on the Tk thread
+        self.player_state = PlayerState(self.root, self.player, self.on_player_change)
+        self.pending_track_load = False
+        self.seek_bar_shown = None  # (position, label text) last drawn, to skip no-op updates
 
         # Translation display below subtitle
         self.translation_box = None # Will be created dynamically
         self.translation_box_hide_job = None
         self.excel_file = 'translations.xlsx'
         self.setup_excel_file()
+        self.journal = TranslationJournal('translations.jsonl')
+        self.import_excel_file()
+        self.export_interval_ms = 5 * 60 * 1000
+        self.export_job = self.root.after(self.export_interval_ms, self.periodic_export)
+
+        # Ollama model, behind a persistent translation cache
+        self.translation_cache = TranslationCache('translation_cache.db')
+        self.translator = Translator(model, source_language="es", cache=self.translation_cache,
+                                     backend=backend, timeout=timeout)
+        self.seed_translation_cache()
+        self.translation_cache.warm(self.translator.model, self.translator.source_language)
+
+        # Model requests run on a small pool; workbook exports go through a single
+        # writer so they never interleave. Results come back on the Tk thread.
+        self.translation_worker = BackgroundWorker(self.root, max_workers=2, name="translate")
+        self.write_worker = BackgroundWorker(self.root, max_workers=1, name="excel-writer")
+        self.media_worker = BackgroundWorker(self.root, max_workers=1, name="media")
+        self.translation_worker.submit(self.translator.warm_up)  # Load the model before the first click
+        self.translation_request_id = 0  # Bumped per click so stale results can be dropped
+        self.click_started = 0.0
+        self.prefetcher = PrefetchScheduler(self.translator, is_busy=lambda: self.translation_worker.pending > 0, by_cue=self.context_var.get())
+        METRICS.add_counters("translation_cache", self.translation_cache.stats)
+        METRICS.add_counters("prefetch", self.prefetcher.stats)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Latency summary, rewritten once a minute when a file was asked for
+        self.metrics_file = metrics_file
+        self.metrics_interval_ms = 60 * 1000
+        self.metrics_job = self.root.after(self.metrics_interval_ms, self.dump_metrics) if metrics_file else None
 
         # Bind configure event after all initializations
+        self.resize_job = None
+        self.rendered_geometry = None  # (font size, overlay width) of the last render
         self.root.bind('<Configure>', self.update_font_size)
 
+    @property
+    def ollama_model(self):
+        return self.translator.model
+
+    @ollama_model.setter
+    def ollama_model(self, model):
+        # Cached translations are per model, so switching drops the old ones from memory
+        self.translator.set_model(model)
+        self.translation_worker.submit(self.translator.warm_up)
+
+    def on_player_change(self, kinds):
+        if 'time' in kinds:
+            self.update_subtitles()
+        if kinds & {'time', 'length', 'stopped'}:
+            self.update_seek_bar()
+        if 'playing' in kinds:
+            self.play_pause_btn.config(text="Pause")
+        elif kinds & {'paused', 'stopped', 'ended', 'error'}:
+            self.play_pause_btn.config(text="Play")
+        if 'parsed' in kinds and self.pending_track_load:
+            self.pending_track_load = False
+            self.load_subtitle_tracks()
+
     def toggle_play_pause(self):
         if self.player.is_playing():
             self.player.pause()
             self.play_pause_btn.config(text="Play")
+            self.player_state.wake(PlayerState.PAUSED)
         else:
             self.player.play()
             self.play_pause_btn.config(text="Pause")
+            self.player_state.wake(PlayerState.PLAYED)
 
     def stop_video(self):
         self.player.stop()
+        self.player_state.wake(PlayerState.STOPPED)
         self.play_pause_btn.config(text="Play")
         self.seek_var.set(0)
         self.time_label.config(text="00:00 / 00:00")
+        self.seek_bar_shown = None
 
     def seek_video(self, value):
-        if self.player.get_length() > 0:
-            new_time = float(value) / 100 * self.player.get_length()
-            self.player.set_time(int(new_time))
+        length = self.player_state.length_ms
+        if length > 0:
+            new_time = int(float(value) / 100 * length)
+            if self.seek_bar_shown and abs(float(value) - self.seek_bar_shown[0]) < 0.05:
+                return  # Tk also calls this when update_seek_bar moves the bar
+            self.player.set_time(new_time)
+            self.player_state.seeked(new_time)
+            self.player_state.wake(PlayerState.SEEKED)
+            self.subtitles.reset_cursor()
+            self.prefetcher.reset()
 
     def update_seek_bar(self):
-        if self.player.get_length() > 0:
-            pos = self.player.get_time() / self.player.get_length() * 100
-            self.seek_var.set(pos)
-            cur = self.format_time(self.player.get_time() // 1000)
-            total = self.format_time(self.player.get_length() // 1000)
-            self.time_label.config(text=f"{cur} / {total}")
-        self.root.after(500, self.update_seek_bar)
+        length = self.player_state.length_ms
+        if length > 0:
+            time_ms = self.player_state.time_ms
+            # Redraw only when the bar moves by a pixel-ish step or the clock ticks over
+            pos = round(time_ms / length * 100, 1)
+            cur = self.format_time(time_ms // 1000)
+            total = self.format_time(length // 1000)
+            shown = (pos, f"{cur} / {total}")
+            if shown != self.seek_bar_shown:
+                if self.seek_bar_shown is None or pos != self.seek_bar_shown[0]:
+                    self.seek_var.set(pos)
+                if self.seek_bar_shown is None or shown[1] != self.seek_bar_shown[1]:
+                    self.time_label.config(text=shown[1])
+                self.seek_bar_shown = shown
 
     def format_time(self, seconds):
         m, s = divmod(int(seconds), 60)
@@ -138,20 +2118,26 @@ class SubtitleTranslatorApp:
     def load_video(self):
         video_file = filedialog.askopenfilename(filetypes=[("Video files", "*.mp4 *.mkv *.avi")])
         if video_file:
+            self.cancel_extraction()
+            self.video_generation += 1
             self.media = self.instance.media_new(video_file)
+            self.player_state.attach_media(self.media)
+            self.seek_bar_shown = None
             self.player.set_media(self.media)
             self.player.set_hwnd(self.canvas.winfo_id())
             self.player.play()
+            self.player_state.wake(PlayerState.PLAYED)
             self.status_label.config(text="Extracting embedded subtitles...")
             self.extract_embedded_subtitles(video_file)
             self.play_pause_btn.config(text="Pause")
-            self.root.after(500, self.update_seek_bar)
         else:
             self.status_label.config(text="Please select a video file.")
 
     def load_subtitle_tracks(self):
-        # Wait briefly for VLC to load media
-        time.sleep(1)
+        # VLC only knows the tracks once the media is parsed; come back on MediaParsedChanged
+        if not self.player_state.parsed:
+            self.pending_track_load = True
+            return
         self.subtitle_tracks = []
         tracks = self.player.video_get_spu_description()
         if not tracks:
@@ -210,110 +2196,101 @@ class SubtitleTranslatorApp:
     def load_subtitles(self):
         srt_file = filedialog.askopenfilename(filetypes=[("Subtitle files", "*.srt")])
         if srt_file:
+            self.cancel_extraction()
+            self.video_generation += 1  # A cached track still being parsed must not replace this file
             self.subtitles = self.parse_srt_file(srt_file)
+            self.prefetcher.reset()
             self.status_label.config(text=f"Loaded subtitles: {srt_file}")
         else:
             self.status_label.config(text="No subtitle file selected.")
 
     def parse_srt_file(self, srt_path):
-        with open(srt_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        pattern = re.compile(r'(\d+)\s+(\d{2}:\d{2}:\d{2},\d{3})\s*-->\s*(\d{2}:\d{2}:\d{2},\d{3})\s+(.+?)(?=\n\n|\Z)', re.DOTALL)
-        subtitles = []
-        for match in pattern.finditer(content):
-            idx, start, end, text = match.groups()
-            start_sec = self.srt_time_to_seconds(start)
-            end_sec = self.srt_time_to_seconds(end)
-            text = text.replace('\n', ' ').strip()
-            subtitles.append({'start': start_sec, 'end': end_sec, 'text': text})
-        return subtitles
-
-    def srt_time_to_seconds(self, srt_time):
-        h, m, s_ms = srt_time.split(':')
-        s, ms = s_ms.split(',')
-        return int(h) * 3600 + int(m) * 60 + int(s) + int(ms) / 1000
+        return CueTimeline(iter_srt_cues(srt_path))
 
     def update_subtitles(self, event=None):
-        self.root.update_idletasks() # Ensure root window geometry is updated
-        current_time = self.player.get_time() / 1000  # VLC returns ms
-        subtitle_line = ""
-        for sub in self.subtitles:
-            if sub['start'] <= current_time <= sub['end']:
-                subtitle_line = sub['text']
-                break
+        current_time = self.player_state.time_ms / 1000  # VLC reports ms
+        start = time.perf_counter()
+        subtitle_line = self.subtitles.text_at(current_time)
+        METRICS.record("cue_lookup", time.perf_counter() - start)
+        self.prefetcher.on_tick(self.subtitles, current_time)
         if subtitle_line == self.last_subtitle_text:
             return  # No change, do not update (prevents flicker)
         self.last_subtitle_text = subtitle_line
-        for widget in self.subtitle_overlay.winfo_children():
-            widget.destroy()
-        if subtitle_line:
-            # Ensure the video frame is updated to get correct dimensions
-            self.video_frame.update_idletasks()
-            # Calculate the effective width for the subtitle overlay
-            overlay_width = int(self.video_frame.winfo_width() * 0.9) - 2 * 20 # Subtract padx from subtitle_overlay.config
-
-            self.safe_print(f"Video Frame Width: {self.video_frame.winfo_width()}")
-            self.safe_print(f"Calculated Overlay Width for wrapping: {overlay_width}")
-
-            current_line_frame = None
-            current_line_width = 0
-            words = subtitle_line.split()
-            
-            # Create a font object to measure text width
-            font = tk.font.Font(family="Segoe UI", size=self.subtitle_font_size, weight="bold")
-
-            for word in words:
-                clean_word = re.sub(r"[.,!?]", "", word.lower())
-                # Calculate word width including its own padx
-                word_display_width = font.measure(word) + 2 * 4 # 2 * padx=4 for lbl.pack
-
-                if current_line_frame is None or (current_line_width + word_display_width) > overlay_width:
-                    # Start a new line
-                    current_line_frame = tk.Frame(self.subtitle_overlay, bg="#222222", highlightthickness=0)
-                    current_line_frame.pack(fill=tk.X, expand=True, pady=5) # Use fill=tk.X and expand=True
-                    tk.Frame(current_line_frame, bg="#222222").pack(side=tk.LEFT, expand=True) # Left spacer
-                    current_line_width = 0
-
-                lbl = tk.Label(
-                    current_line_frame,
-                    text=word,
-                    font=("Segoe UI", self.subtitle_font_size, "bold"),
-                    bg="#222222",
-                    fg="#fff",
-                    bd=0,
-                    relief="flat",
-                    highlightthickness=0,
-                    cursor="hand2"
-                )
-                lbl.pack(side=tk.LEFT, padx=4, pady=2)
-                lbl.bind("<Button-1>", lambda e, w=clean_word, l=lbl: self.handle_word_click_gui_pause(w, l))
-                lbl.bind("<Enter>", lambda e, l=lbl: l.config(bg="#444444"))
-                lbl.bind("<Leave>", lambda e, l=lbl: l.config(bg="#222222"))
-                current_line_width += word_display_width
-            # Add right spacer after all words are processed for the last line
-            tk.Frame(current_line_frame, bg="#222222").pack(side=tk.RIGHT, expand=True)
-        else:
-            self.safe_print("No subtitle to display at this time.")
+        self.render_subtitle()
         # Hide translation box if no subtitle is displayed
         if not subtitle_line and self.translation_box and self.translation_box.winfo_ismapped():
             self.hide_translation_box()
 
+    def overlay_width(self):
+        # Calculate the effective width for the subtitle overlay
+        return int(self.video_frame.winfo_width() * 0.9) - 2 * 20 # Subtract padx from subtitle_overlay.config
+
+    def render_subtitle(self):
+        overlay_width = self.overlay_width()
+        self.rendered_geometry = (self.subtitle_font_size, overlay_width)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Video frame width %d, overlay wrap width %d", self.video_frame.winfo_width(), overlay_width)
+        with METRICS.timed("overlay_render"):
+            self.overlay_renderer.render(self.last_subtitle_text or "", self.subtitle_font_size, overlay_width)
+
     def handle_word_click_gui_pause(self, word, label_widget):
-        self.safe_print(f"Word clicked: {word}")
+        log.debug("Word clicked: %s", word)
+        self.click_started = time.perf_counter()
         # Pause video on word click
         if self.player.is_playing():
             self.player.pause()
             self.play_pause_btn.config(text="Play")
+            self.player_state.wake(PlayerState.PAUSED)
         # Read-along effect: highlight the word briefly
         orig_bg = label_widget.cget("bg")
         label_widget.config(bg="#ffe066")
         label_widget.after(350, lambda: label_widget.config(bg=orig_bg))
-        translation = self.translate_word(word)
-        self.show_translation_box(translation, label_widget)
-        self.save_translation(word, translation, self.last_subtitle_text)
+        self.translation_request_id += 1
+        request_id = self.translation_request_id
+        sentence = self.last_subtitle_text
+        if self.context_var.get() and sentence:
+            cached = self.translator.cached_in_context(word, sentence)
+            self.prefetcher.record_click(cue_key(sentence), cached is not None)
+            # The click's lookup above is the one that counts as a cache hit or miss
+            job = lambda word, sentence: self.translator.translate_in_context(word, sentence, record=False)
+        else:
+            cached = self.translator.cached_translation(word)
+            lemma = canonical_word(word)
+            self.prefetcher.record_click(lemma, cached is not None)
+            # Word translations are of the lemma, which is shown under them
+            note = f"({lemma})" if lemma != normalize_word(word) else ""
+            if cached is not None:
+                cached = (cached, note)
+            job = lambda word, sentence: (self.translate_with_cue(word, sentence), note)
+        if cached is not None:
+            self.on_translation_ready(request_id, word, cached, sentence, label_widget)
+            return
+        self.show_translation_box("translating…", label_widget, hide_after=None)
+        self.translation_worker.submit(
+            job, word, sentence,
+            callback=lambda result: self.on_translation_ready(request_id, word, result, sentence, label_widget),
+        )
 
-    def show_translation_box(self, translation, label_widget):
-        self.safe_print(f"Showing translation box for: {translation}")
+    def on_translation_ready(self, request_id, word, result, sentence, label_widget):
+        # The word was clicked either way, so it is always logged; only the
+        # latest click gets to show its result
+        translation, gloss = result
+        if not translation_failed(translation):
+            self.save_translation(word, translation, sentence)
+        if request_id != self.translation_request_id:
+            log.debug("Dropping stale translation for: %s", word)
+            return
+        if self.overlay_renderer.shows(label_widget, word):
+            self.show_translation_box(f"{translation}\n{gloss}" if gloss else translation, label_widget)
+            METRICS.record("click_to_translation", time.perf_counter() - self.click_started)
+        else:
+            self.hide_translation_box()
+
+    def toggle_context_mode(self):
+        self.prefetcher.set_by_cue(self.context_var.get())
+
+    def show_translation_box(self, translation, label_widget, hide_after=3000):
+        log.debug("Showing translation box for: %s", translation)
         # Destroy existing translation box if it exists
         if self.translation_box:
             self.translation_box.destroy()
@@ -325,16 +2302,17 @@ class SubtitleTranslatorApp:
             self.translation_box_hide_job = None
 
         # Create a new translation box
-        self.translation_box = tk.Label(self.root, text=translation, font=("Segoe UI", 18, "italic"), bg="#fffbe6", fg="#333", bd=2, relief="ridge", padx=16, pady=8)
+        self.translation_box = tk.Label(self.root, text=translation, font=("Segoe UI", 18, "italic"), bg="#fffbe6", fg="#333", bd=2, relief="ridge", padx=16, pady=8, wraplength=max(300, self.overlay_width()))
 
         # Place above the clicked word
         x = label_widget.winfo_rootx() - self.video_frame.winfo_rootx()
         y = label_widget.winfo_rooty() - self.video_frame.winfo_rooty() - self.translation_box.winfo_reqheight() - 25 # Adjusted higher
-        self.safe_print(f"Placing translation box at x={x}, y={y}")
+        log.debug("Placing translation box at x=%d, y=%d", x, y)
         self.translation_box.place(x=x, y=y)
 
-        # Hide after 3 seconds
-        self.translation_box_hide_job = self.root.after(3000, self.hide_translation_box)
+        # Hide after 3 seconds (placeholders stay until their result arrives)
+        if hide_after is not None:
+            self.translation_box_hide_job = self.root.after(hide_after, self.hide_translation_box)
 
     def hide_translation_box(self):
         if self.translation_box:
@@ -344,106 +2322,206 @@ class SubtitleTranslatorApp:
         self.subtitle_overlay.update_idletasks()
 
     def translate_word(self, word):
-        self.safe_print(f"Attempting to translate: {word}")
-        try:
-            prompt = f"Translate the Spanish word '{word}' to English. Provide only the translated word or a short phrase."
-            response = ollama.generate(model=self.ollama_model, prompt=prompt)
-            translated_text = response["response"].strip()
-            self.safe_print(f"Translated '{word}' to: {translated_text}")
-            return translated_text
-        except Exception as e:
-            self.safe_print(f"Error translating '{word}': {str(e)}")
-            return f"Error translating: {str(e)}"
+        return self.translator.translate_word(word)
+
+    def translate_with_cue(self, word, sentence, batch_size=8):
+        # Translate the clicked word together with the rest of its line in one
+        # request, so the next click on the same line is served from the cache.
+        # The click already counted its own cache lookup; the companion words
+        # are not clicks and are not counted.
+        deadline = self.translator.deadline()
+        words = [word] + [key for _, key in subtitle_words(sentence or "")]
+        translation = self.translator.translate_words(words[:batch_size], record=False, deadline=deadline).get(canonical_word(word))
+        return translation or self.translator.translate_word(word, deadline, record=False)
+
+    def probe_video(self, video_file):
+        key = self.subtitle_cache.key(video_file)
+        return key, self.subtitle_cache.probe(video_file, key)
 
     def extract_embedded_subtitles(self, video_file):
-        # Get subtitle tracks using ffmpeg
-        try:
-            cmd = [
-                "ffmpeg", "-hide_banner", "-i", video_file
-            ]
-            result = subprocess.run(cmd, stderr=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
-            output = result.stderr
-            # Find subtitle tracks
-            import re
-            tracks = re.findall(r'Stream #(\d+):(\d+)(?:\((\w*)\))?: Subtitle: ([^\n]+)', output)
-            if not tracks:
-                self.status_label.config(text="No embedded subtitle tracks found.")
-                return
-            # Prompt user to select track
-            dialog = tk.Toplevel(self.root)
-            dialog.title("Select Subtitle Track to Extract")
-            dialog.geometry("500x300")
-            tk.Label(dialog, text="Select a subtitle track to extract:", font=("Segoe UI", 11)).pack(pady=5)
-            track_options = [f"Track {idx}: Stream {stream_idx}:{track_idx}{f' ({lang})' if lang else ''} - {desc}" for idx, (stream_idx, track_idx, lang, desc) in enumerate(tracks)]
-            combobox = ttk.Combobox(dialog, values=track_options, state="readonly", font=("Segoe UI", 10))
-            combobox.pack(pady=10, fill=tk.X, padx=20)
-            combobox.current(0)  # Select the first item by default
-            def on_ok():
-                selected_idx = combobox.current()
-                if selected_idx != -1:
-                    dialog.destroy()
-                    self.selected_subtitle_info = tracks[selected_idx]
-                    self.status_label.config(text=f"Using subtitle track: {track_options[selected_idx]}")
-                    self.run_ffmpeg_extract(video_file, selected_idx)
-                else:
-                    messagebox.showwarning("Warning", "Please select a subtitle track.")
-            tk.Button(dialog, text="OK", command=on_ok, font=("Segoe UI", 11), bg="#e0e0e0").pack(pady=10)
-        except Exception as e:
-            self.status_label.config(text=f"Error extracting subtitle tracks: {e}")
+        # Hash and probe (ffprobe, cached per file identity) on the media worker
+        generation = self.video_generation
+        def on_probe(result):
+            if generation == self.video_generation:
+                self.select_embedded_track(video_file, *result)
+        def on_error(e):
+            if generation == self.video_generation:
+                self.status_label.config(text=f"Error extracting subtitle tracks: {e}")
+        self.media_worker.submit(self.probe_video, video_file, callback=on_probe, errback=on_error)
 
-    def run_ffmpeg_extract(self, video_file, track_idx):
-        # Extract the selected subtitle track to a temp .srt file
-        try:
-            temp_dir = tempfile.gettempdir()
-            srt_path = os.path.join(temp_dir, f"extracted_subs_{os.getpid()}.srt")
-            cmd = [
-                "ffmpeg", "-y", "-i", video_file, f"-map", f"0:s:{track_idx}", srt_path
-            ]
-            result = subprocess.run(cmd, stderr=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
-            if os.path.exists(srt_path):
-                self.safe_print(f"Extracted SRT file: {srt_path}, size: {os.path.getsize(srt_path)} bytes")
-            if os.path.exists(srt_path) and os.path.getsize(srt_path) > 0:
-                self.subtitles = self.parse_srt_file(srt_path)
-                self.safe_print(f"Loaded {len(self.subtitles)} subtitles from {srt_path}")
-                if self.subtitles:
-                    self.safe_print(f"First subtitle: {self.subtitles[0]}")
-                    self.safe_print(f"Last subtitle: {self.subtitles[-1]}")
-                self.status_label.config(text=f"Loaded extracted subtitles from track {track_idx}.")
+    def select_embedded_track(self, video_file, key, probe):
+        tracks = probe['streams']
+        if not tracks:
+            self.status_label.config(text="No embedded text subtitle tracks found.")
+            return
+        # Prompt user to select track
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Select Subtitle Track to Extract")
+        dialog.geometry("500x300")
+        tk.Label(dialog, text="Select a subtitle track to extract:", font=("Segoe UI", 11)).pack(pady=5)
+        track_options = [describe_stream(idx, stream) for idx, stream in enumerate(tracks)]
+        combobox = ttk.Combobox(dialog, values=track_options, state="readonly", font=("Segoe UI", 10))
+        combobox.pack(pady=10, fill=tk.X, padx=20)
+        combobox.current(0)  # Select the first item by default
+        def on_ok():
+            selected_idx = combobox.current()
+            if selected_idx != -1:
+                dialog.destroy()
+                self.selected_subtitle_info = tracks[selected_idx]
+                self.status_label.config(text=f"Using subtitle track: {track_options[selected_idx]}")
+                self.run_ffmpeg_extract(video_file, key, probe, selected_idx)
             else:
-                self.safe_print("Failed to extract subtitles or no subtitles found in selected track.")
-                self.status_label.config(text="Failed to extract subtitles or no subtitles found in selected track.")
+                messagebox.showwarning("Warning", "Please select a subtitle track.")
+        tk.Button(dialog, text="OK", command=on_ok, font=("Segoe UI", 11), bg="#e0e0e0").pack(pady=10)
+
+    def run_ffmpeg_extract(self, video_file, key, probe, track_idx):
+        # Extract every missing text track in one background pass and stream the
+        # selected one into the timeline as ffmpeg writes it
+        self.cancel_extraction()
+        tracks = probe['streams']
+        stream = tracks[track_idx]
+        missing = self.subtitle_cache.missing(key, tracks)
+        if stream not in missing:
+            self.load_cached_track(self.subtitle_cache.track_path(key, stream), track_idx)
+            return
+        self.subtitles = CueTimeline()
+        self.prefetcher.reset()
+        self.last_subtitle_text = None
+        run = self.subtitle_cache.new_run()
+        try:
+            self.extraction = ExtractionJob(
+                self.subtitle_cache.extract_command(video_file, key, missing, run), probe['duration'],
+                on_cancelled=lambda: self.subtitle_cache.discard(key, missing, run),
+            ).start()
         except Exception as e:
-            self.safe_print(f"Error extracting subtitles: {e}")
+            self.extraction = None
+            log.error("Error extracting subtitles: %s", e)
             self.status_label.config(text=f"Error extracting subtitles: {e}")
+            return
+        self.extraction_tail = SrtTail(self.subtitle_cache.partial_path(key, stream, run))
+        self.extraction_target = (key, missing, track_idx, run)
+        self.progress_bar.config(mode="determinate" if probe['duration'] else "indeterminate", value=0)
+        if not probe['duration']:
+            self.progress_bar.start(50)
+        self.progress_bar.pack(pady=(0, 5))
+        self.extraction_poll_job = self.root.after(250, self.poll_extraction)
 
-    def safe_print(self, text):
-        try:
-            print(text)
-        except UnicodeEncodeError:
-            print(text.encode('utf-8', 'ignore').decode('ascii', 'ignore'))
+    def poll_extraction(self):
+        self.extraction_poll_job = None
+        job = self.extraction
+        if job is None:
+            return
+        finished = not job.running  # Checked before reading, so the final read sees all output
+        cues = self.extraction_tail.read_new(final=finished)
+        if cues:
+            self.subtitles.extend(cues)
+        if not finished:
+            if job.fraction is not None:
+                self.progress_bar.config(value=job.fraction * 100)
+                self.status_label.config(text=f"Extracting subtitles... {job.fraction:.0%} ({len(self.subtitles)} lines ready)")
+            self.extraction_poll_job = self.root.after(250, self.poll_extraction)
+            return
+        key, missing, track_idx, run = self.extraction_target
+        self.finish_extraction()
+        if job.returncode == 0:
+            self.subtitle_cache.commit(key, missing, run)
+        else:
+            self.subtitle_cache.discard(key, missing, run)
+        if job.returncode == 0 and len(self.subtitles):
+            log.info("Loaded %d subtitles from track %d", len(self.subtitles), track_idx)
+            log.debug("First subtitle: %s, last subtitle: %s", self.subtitles[0], self.subtitles[-1])
+            self.status_label.config(text=f"Loaded extracted subtitles from track {track_idx}.")
+        else:
+            log.warning("Failed to extract subtitles or no subtitles found in selected track. %s", job.error)
+            self.status_label.config(text="Failed to extract subtitles or no subtitles found in selected track.")
+
+    def load_cached_track(self, srt_path, track_idx):
+        generation = self.video_generation
+        def on_parsed(timeline):
+            if generation != self.video_generation:
+                return
+            self.subtitles = timeline
+            self.prefetcher.reset()
+            self.last_subtitle_text = None
+            log.info("Loaded %d cached subtitles from %s", len(self.subtitles), srt_path)
+            self.status_label.config(text=f"Loaded extracted subtitles from track {track_idx}.")
+        def on_error(e):
+            self.status_label.config(text=f"Error loading cached subtitles: {e}")
+        self.media_worker.submit(self.parse_srt_file, srt_path, callback=on_parsed, errback=on_error)
+
+    def finish_extraction(self):
+        if self.extraction_poll_job:
+            self.root.after_cancel(self.extraction_poll_job)
+            self.extraction_poll_job = None
+        self.extraction = None
+        self.progress_bar.stop()
+        self.progress_bar.pack_forget()
+
+    def cancel_extraction(self):
+        # A new video (or track) supersedes whatever ffmpeg is still demuxing
+        if self.extraction is not None:
+            self.extraction.cancel()
+            log.info("Cancelled subtitle extraction")
+            self.finish_extraction()
 
     def resume_video(self):
         if not self.player.is_playing():
             self.player.play()
             self.play_pause_btn.config(text="Pause")
+            self.player_state.wake(PlayerState.PLAYED)
 
     def seek_relative(self, seconds):
-        cur_time = self.player.get_time() // 1000  # in seconds
+        cur_time = self.player_state.time_ms // 1000  # in seconds
         new_time = max(0, cur_time + seconds)
         self.player.set_time(int(new_time * 1000))
+        self.player_state.seeked(int(new_time * 1000))
+        self.player_state.wake(PlayerState.SEEKED)
+        self.subtitles.reset_cursor()
+        self.prefetcher.reset()
 
     def run(self):
         self.root.mainloop()
 
+    def on_close(self):
+        self.player_state.close()
+        self.cancel_extraction()
+        self.media_worker.shutdown(wait=False)
+        self.prefetcher.shutdown()
+        log.info("Translation cache: %s", self.translation_cache.stats())
+        log.info("Prefetch: %s", self.prefetcher.stats())
+        self.translator.close()  # Aborts requests in flight, so exit never waits on the model
+        self.translation_worker.shutdown(wait=False)
+        self.write_worker.shutdown(wait=True)  # Let a running export land
+        self.root.after_cancel(self.export_job)
+        self.journal.close()
+        if self.journal.dirty:
+            self.journal.export_xlsx(self.excel_file)
+        if self.metrics_job:
+            self.root.after_cancel(self.metrics_job)
+            self.dump_metrics(reschedule=False)
+        self.root.destroy()
+
     def toggle_fullscreen(self, event=None):
         current_state = self.root.attributes("-fullscreen")
         self.root.attributes("-fullscreen", not current_state)
 
     def update_font_size(self, event=None):
+        # <Configure> on the root also fires for every child widget, and in bursts
+        # while the window is dragged; coalesce them into one relayout
+        if event is not None and event.widget is not self.root:
+            return
+        if self.resize_job:
+            self.root.after_cancel(self.resize_job)
+        self.resize_job = self.root.after(100, self.apply_font_size)
+
+    def apply_font_size(self):
+        self.resize_job = None
         width = self.root.winfo_width()
         self.subtitle_font_size = max(14, int(width / 60))
-        # Re-render current subtitle to apply new font size immediately
-        self.update_subtitles(None) # Pass None as event, as it's not a MediaPlayerTimeChanged event
+        if (self.subtitle_font_size, self.overlay_width()) == self.rendered_geometry:
+            return  # Same font size and wrap width, nothing to re-lay out
+        # Re-render current subtitle to apply new font size
+        self.render_subtitle()
 
     def setup_excel_file(self):
         if not os.path.exists(self.excel_file):
@@ -453,16 +2531,205 @@ class SubtitleTranslatorApp:
             sheet.append(["Original Word", "Translation", "Sentence"])
             workbook.save(self.excel_file)
 
+    def import_excel_file(self):
+        # The journal is the source of truth; pull in the workbook when it was
+        # changed after the journal (first run, or edited by hand)
+        self.workbook_rows = []
+        journal_mtime = os.path.getmtime(self.journal.path) if len(self.journal) else 0
+        if os.path.getmtime(self.excel_file) <= journal_mtime:
+            self.journal.mark_exported()
+            return
+        try:
+            self.workbook_rows = self.journal.import_workbook(self.excel_file)
+            log.info("Imported %d new or edited translations from %s", len(self.workbook_rows), self.excel_file)
+        except Exception as e:
+            log.warning("Could not import %s: %s", self.excel_file, e)
+        self.journal.mark_exported()
+
+    def seed_translation_cache(self):
+        # Read back words saved by earlier sessions the first time the cache is used with a model
+        model, lang = self.translator.model, self.translator.source_language
+        if not self.translation_cache.count(model, lang):
+            rows = [(word, translation) for word, translation, _ in self.journal.rows
+                    if not translation_failed(translation)]
+            self.translation_cache.import_rows(model, lang, rows)
+        # Words added or corrected in the workbook replace whatever the model answered
+        edits = [(word, translation) for word, translation in self.workbook_rows if not translation_failed(translation)]
+        self.translation_cache.import_rows(model, lang, edits, replace=True)
+
     def save_translation(self, word, translation, sentence):
-        workbook = openpyxl.load_workbook(self.excel_file)
-        sheet = workbook.active
-        for row in sheet.iter_rows(min_row=2, values_only=True):
-            if row[0] == word:
-                return # Word already exists
-        sheet.append([word, translation, sentence])
-        workbook.save(self.excel_file)
+        # O(1): deduplicated in memory, persisted by the journal's writer thread
+        self.journal.append(word, translation, sentence)
 
-if __name__ == "__main__":
+    def export_translations(self):
+        self.status_label.config(text=f"Exporting translations to {self.excel_file}...")
+        self.write_worker.submit(
+            self.journal.export_xlsx, self.excel_file,
+            callback=lambda count: self.status_label.config(text=f"Exported {count} translations to {self.excel_file}."),
+        )
+
+    def periodic_export(self):
+        if self.journal.dirty:
+            self.write_worker.submit(self.journal.export_xlsx, self.excel_file)
+        self.export_job = self.root.after(self.export_interval_ms, self.periodic_export)
+
+    def dump_metrics(self, reschedule=True):
+        try:
+            METRICS.dump(self.metrics_file)
+        except OSError as e:
+            log.warning("Could not write metrics to %s: %s", self.metrics_file, e)
+        if reschedule:
+            self.metrics_job = self.root.after(self.metrics_interval_ms, self.dump_metrics)
+
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.avi')
+SPANISH_LANGUAGE_TAGS = ('spa', 'es', 'esp', 'spanish', 'español')
+
+def find_media(paths):
+    # Yields every .srt and video file under the given files/directories, in a stable order
+    for path in paths:
+        if os.path.isfile(path):
+            yield path
+            continue
+        for directory, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if name.lower().endswith(('.srt',) + VIDEO_EXTENSIONS):
+                    yield os.path.join(directory, name)
+
+def subtitle_files_for(media_file, subtitle_cache):
+    # An .srt is used as is; a video contributes its Spanish text tracks
+    # (or every text track when none is language-tagged), extracted via the cache
+    if media_file.lower().endswith('.srt'):
+        return [media_file]
+    key = subtitle_cache.key(media_file)
+    streams = subtitle_cache.probe(media_file, key)['streams']
+    spanish = [s for s in streams if s['language'].lower() in SPANISH_LANGUAGE_TAGS
+               or 'spanish' in s['title'].lower() or 'español' in s['title'].lower()]
+    if not spanish and not any(s['language'] for s in streams):
+        spanish = streams
+    if not spanish:
+        return []
+    return list(subtitle_cache.extract(media_file, key, spanish).values())
+
+def pretranslate(args):
+    subtitle_cache = SubtitleCache(args.subtitle_cache)
+    translator = Translator(args.model, source_language="es", cache=TranslationCache(args.cache_db),
+                            backend=make_backend(args, max_concurrency=args.workers), timeout=args.timeout)
+    METRICS.add_counters("translation_cache", translator.cache.stats)
+    started = time.perf_counter()
+
+    # Build every file's vocabulary, deduplicated across the whole corpus
+    corpus = {}
+    surfaces = set()
+    lines = {}
+    occurrences = 0
+    per_file_total = 0
+    files = 0
+    for media_file in find_media(args.paths):
+        try:
+            srt_files = subtitle_files_for(media_file, subtitle_cache)
+        except Exception as e:
+            safe_print(f"Skipping {media_file}: {e}")
+            continue
+        vocabulary = set()
+        for srt_file in srt_files:
+            for cue in iter_srt_cues(srt_file):
+                if args.context:
+                    lines.setdefault(cue_key(cue.text), None)
+                for _, surface in subtitle_words(cue.text):
+                    key = canonical_word(surface)
+                    if key:
+                        occurrences += 1
+                        surfaces.add(surface)
+                        vocabulary.add(key)
+                        corpus.setdefault(key, None)
+        if srt_files:
+            files += 1
+            per_file_total += len(vocabulary)
+            safe_print(f"{media_file}: {len(vocabulary)} distinct words")
+    scanned = time.perf_counter()
+
+    todo = [word for word in corpus if translator.cached_translation(word, record=False) is None]
+    safe_print(f"{files} files, {occurrences} words, {per_file_total} per-file vocabulary entries, "
+               f"{len(surfaces)} distinct forms of {len(corpus)} lemmas across the corpus, "
+               f"{len(corpus) - len(todo)} already cached")
+
+    # Translate the rest in batches spread over concurrent model workers
+    batches = [todo[i:i + args.batch_size] for i in range(0, len(todo), args.batch_size)]
+    translated = 0
+    failed = 0
+    with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="pretranslate") as executor:
+        for results in executor.map(lambda batch: translator.translate_words(batch, record=False), batches):
+            for translation in results.values():
+                if translation_failed(translation):
+                    failed += 1
+                else:
+                    translated += 1
+        if args.context:
+            # One request per distinct line, as the player's "Translate in context" mode needs
+            cache = translator.cache
+            todo_lines = [line for line in lines if cache.get_cue(translator.model, "es", line, record=False) is None]
+            safe_print(f"{len(lines)} distinct lines, {len(lines) - len(todo_lines)} already cached")
+            results = list(executor.map(lambda line: translator.translate_cue(line, record=False), todo_lines))
+            failed += results.count(None)
+            safe_print(f"Translated {len(results) - results.count(None)} lines in context")
+    finished = time.perf_counter()
+
+    translate_seconds = finished - scanned
+    safe_print(f"Scanned in {scanned - started:.1f} s, translated {translated} words "
+               f"({failed} failed) in {translate_seconds:.1f} s "
+               f"({translated / translate_seconds if translate_seconds else 0:.1f} words/s, {args.workers} workers)")
+    if corpus:
+        safe_print(f"Dedup ratio: {occurrences / len(corpus):.1f} occurrences per unique word, "
+                   f"{per_file_total / len(corpus):.2f} per-file entries per unique word; "
+                   f"{len(todo)} model lookups instead of {occurrences}")
+    return 1 if failed else 0
+
+def make_backend(args, max_concurrency):
+    if args.backend == "stub":
+        return StubBackend()
+    return OllamaBackend(args.ollama_host, keep_alive=args.keep_alive, max_concurrency=max_concurrency, timeout=args.timeout)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Subtitle translator. Without a command, starts the player.")
+    parser.add_argument("--log-level", default="warning", choices=["debug", "info", "warning", "error"],
+                        help="diagnostics printed to stderr (default: %(default)s)")
+    parser.add_argument("--metrics-file", help="write p50/p95/p99 latencies per stage to this JSON file "
+                        "(every minute and on exit)")
+    parser.add_argument("--metrics-port", type=int, help="serve the same summary at http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--model", default=os.environ.get("SUBTITLE_TRANSLATOR_MODEL", DEFAULT_MODEL),
+                        help="Ollama model (default: $SUBTITLE_TRANSLATOR_MODEL or %(default)s)")
+    parser.add_argument("--backend", choices=["ollama", "stub"], default="ollama",
+                        help="'stub' answers '<word> (en)' without a model, for trying things out (default: %(default)s)")
+    parser.add_argument("--ollama-host", help="Ollama address (default: $OLLAMA_HOST or 127.0.0.1:11434)")
+    parser.add_argument("--keep-alive", default="30m", help="how long Ollama keeps the model loaded (default: %(default)s)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds before a translation gives up (default: %(default)s)")
+    parser.add_argument("--max-requests", type=int, default=2, help="concurrent model requests in the player (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command")
+    pre = commands.add_parser("pretranslate", help="Translate the vocabulary of .srt files and videos ahead of time, without the GUI")
+    pre.add_argument("paths", nargs="+", help=".srt files, videos, or directories to scan recursively")
+    pre.add_argument("--workers", type=int, default=2, help="concurrent model requests (default: %(default)s)")
+    pre.add_argument("--batch-size", type=int, default=8, help="words per model request (default: %(default)s)")
+    pre.add_argument("--context", action="store_true", help="also translate every distinct line in context")
+    pre.add_argument("--cache-db", default="translation_cache.db", help="translation store (default: %(default)s)")
+    pre.add_argument("--subtitle-cache", default=default_cache_dir(), help="extracted subtitle cache (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    # Only this program's logger follows --log-level; libraries stay at warnings
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s [%(threadName)s] %(message)s")
+    log.setLevel(args.log_level.upper())
+    if args.metrics_port:
+        METRICS.serve(args.metrics_port)
+    if args.command == "pretranslate":
+        status = pretranslate(args)
+        if args.metrics_file:
+            METRICS.dump(args.metrics_file)
+        return status
     root = tk.Tk()
-    app = SubtitleTranslatorApp(root)
-    app.run()
\ No newline at end of file
+    app = SubtitleTranslatorApp(root, metrics_file=args.metrics_file, model=args.model,
+                                backend=make_backend(args, max_concurrency=args.max_requests), timeout=args.timeout)
+    app.run()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
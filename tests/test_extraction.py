@@ -0,0 +1,31 @@
+import sys
+import time
+
+from subtitle_translator_v36 import ExtractionJob
+
+# Stands in for ffmpeg: floods stderr well past a pipe buffer, then reports progress and exits
+NOISY = """
+import sys
+for i in range(20000):
+    sys.stderr.write(f"[srt @ 0x1] Invalid packet {i}: damaged subtitle data\\n")
+sys.stdout.write("out_time_us=5000000\\nprogress=end\\n")
+sys.exit(1)
+"""
+
+
+def run(job, timeout=20):
+    job.cmd = [sys.executable, "-c", NOISY]  # Without the ffmpeg-only progress flags
+    job.start()
+    deadline = time.monotonic() + timeout
+    while job.running and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+def test_a_flood_of_errors_does_not_stall_the_job():
+    job = run(ExtractionJob(["ffmpeg"]))
+    assert not job.running
+    assert job.returncode == 1
+    assert job.out_time == 5.0
+    lines = job.error.splitlines()
+    assert len(lines) == 20 and lines[-1].endswith("Invalid packet 19999: damaged subtitle data")
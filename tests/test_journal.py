@@ -0,0 +1,61 @@
+import openpyxl
+
+from subtitle_translator_v36 import TranslationCache, TranslationJournal
+
+ROWS = [
+    ("será", "Will be.", "Todo será diferente."),
+    ("fuimos", "We went.", "Fuimos al cine."),
+    ("soy", "I am.", "Soy yo."),
+    ("Hablar", "To speak.", "Hablar es fácil."),
+    ("hablaba", "Was speaking.", "Hablaba con ella."),
+    ("-", "-  (punctuation)", "- Ay, Dios."),
+]
+
+
+def write_workbook(path, rows):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["Original Word", "Translation", "Sentence"])
+    for row in rows:
+        sheet.append(list(row))
+    workbook.save(path)
+
+
+def read_workbook(path):
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    rows = [tuple(row) for row in workbook.active.iter_rows(min_row=2, values_only=True)]
+    workbook.close()
+    return rows
+
+
+def test_import_export_round_trip_keeps_every_surface_form(tmp_path):
+    write_workbook(tmp_path / "in.xlsx", ROWS)
+    journal = TranslationJournal(str(tmp_path / "journal.jsonl"), linger=0)
+    assert len(journal.import_workbook(str(tmp_path / "in.xlsx"))) == len(ROWS)
+    journal.export_xlsx(str(tmp_path / "out.xlsx"))
+    journal.close()
+    assert read_workbook(tmp_path / "out.xlsx") == ROWS
+
+    reloaded = TranslationJournal(str(tmp_path / "journal.jsonl"))
+    reloaded.close()
+    assert reloaded.rows == ROWS
+
+
+def test_hand_edit_replaces_only_its_own_row(tmp_path):
+    journal = TranslationJournal(str(tmp_path / "journal.jsonl"), linger=0)
+    for row in ROWS:
+        journal.append(*row)
+    edited = [("fuimos", "We went (ir).", "Fuimos al cine.") if row[0] == "fuimos" else row for row in ROWS]
+    write_workbook(tmp_path / "edited.xlsx", edited)
+    assert journal.import_workbook(str(tmp_path / "edited.xlsx")) == [("fuimos", "We went (ir).")]
+    journal.close()
+    assert journal.rows == edited
+
+
+def test_cache_is_only_seeded_from_rows_that_are_their_own_lemma():
+    cache = TranslationCache(":memory:")
+    cache.import_rows("m", "es", [(word, translation) for word, translation, _ in ROWS])
+    assert cache.get("m", "es", "hablar") == "To speak."
+    assert cache.get("m", "es", "hablaba") == "To speak."  # Looked up under its lemma
+    assert cache.get("m", "es", "soy") is None  # Nothing saved under "ser" itself
+    assert cache.count("m", "es") == 1
@@ -0,0 +1,37 @@
+import pytest
+
+from subtitle_translator_v36 import LEXICON_PATH, LemmaIndex, normalize_word
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    return LemmaIndex.open(LEXICON_PATH, str(tmp_path_factory.mktemp("lexicon")))
+
+
+def lemma(index, word):
+    return index.lemma(normalize_word(word))
+
+
+@pytest.mark.parametrize("word, expected", [
+    ("hablaba", "hablar"), ("¡Habla!", "hablar"), ("tuviese", "tener"), ("sigáis", "seguir"),
+    ("salgo", "salir"), ("trajo", "traer"), ("partimos", "partir"), ("cortó", "cortar"),
+    ("dímelo", "decir"), ("hacerlo", "hacer"), ("cállate", "callar"),
+])
+def test_inflected_forms_fold_to_their_lemma(index, word, expected):
+    assert lemma(index, word) == expected
+
+
+@pytest.mark.parametrize("word, expected", [
+    # Explicit forms win over generated conjugations
+    ("una", "un"), ("Unas", "un"),
+    # Nouns that collide with a verb form stay as they are
+    ("parte", "parte"), ("corte", "corte"), ("traje", "traje"), ("sal", "sal"), ("cuenta", "cuenta"),
+    ("casa", "casa"), ("como", "como"), ("calle", "calle"), ("uno", "uno"),
+    # ...and so do their plurals
+    ("casas", "casas"), ("casos", "casos"), ("calles", "calles"), ("comidas", "comidas"), ("tardes", "tardes"),
+    ("notas", "notas"), ("vistas", "vistas"), ("queridos", "queridos"), ("partes", "partes"),
+    # Forms shared by two verbs go to the likelier one
+    ("¡Ven!", "venir"), ("vienes", "venir"), ("vemos", "ver"),
+])
+def test_collisions_keep_their_own_meaning(index, word, expected):
+    assert lemma(index, word) == expected
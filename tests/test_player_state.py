@@ -0,0 +1,82 @@
+import time
+from types import SimpleNamespace
+
+from subtitle_translator_v36 import PlayerState
+
+
+class FakeRoot:
+    # Runs after() callbacks only when the test says so
+    def __init__(self):
+        self.jobs = {}
+        self.next_id = 0
+
+    def after(self, ms, callback):
+        self.next_id += 1
+        self.jobs[self.next_id] = callback
+        return self.next_id
+
+    def after_cancel(self, job):
+        self.jobs.pop(job, None)
+
+    def run_pending(self):
+        jobs, self.jobs = self.jobs, {}
+        for callback in jobs.values():
+            callback()
+
+
+class FakeEvents:
+    def __init__(self):
+        self.callbacks = {}
+
+    def event_attach(self, event_type, callback, kind):
+        self.callbacks[kind] = callback
+
+    def fire(self, kind, **payload):
+        self.callbacks[kind](SimpleNamespace(u=SimpleNamespace(**payload)), kind)
+
+
+def make_state(**options):
+    root = FakeRoot()
+    events = FakeEvents()
+    changes = []
+    state = PlayerState(root, SimpleNamespace(event_manager=lambda: events), changes.append, **options)
+    return root, events, changes, state
+
+
+def test_nothing_polls_while_idle():
+    root, _, _, _ = make_state()
+    assert root.jobs == {}
+
+
+def test_stays_awake_until_a_slow_playing_event_arrives():
+    root, events, changes, state = make_state()
+    state.wake(PlayerState.PLAYED)
+    for _ in range(100):  # Far more polls than any fixed grace period would allow
+        root.run_pending()
+    assert root.jobs and changes == []
+    events.fire('playing')
+    events.fire('time', new_time=1500)
+    root.run_pending()
+    assert changes == [{'playing', 'time'}] and state.time_ms == 1500
+    root.run_pending()
+    assert root.jobs  # Still polling during playback
+    events.fire('paused')
+    root.run_pending()
+    assert changes[-1] == {'paused'} and root.jobs == {}
+
+
+def test_a_seek_while_paused_polls_until_the_new_time_arrives():
+    root, events, changes, state = make_state()
+    state.wake(PlayerState.SEEKED)
+    root.run_pending()
+    events.fire('time', new_time=9000)
+    root.run_pending()
+    assert changes == [{'time'}] and root.jobs == {}
+
+
+def test_gives_up_waiting_after_the_bound():
+    root, _, _, state = make_state(max_wait_seconds=0.01)
+    state.wake(PlayerState.PLAYED)
+    time.sleep(0.02)
+    root.run_pending()
+    assert root.jobs == {}
@@ -0,0 +1,123 @@
+import pytest
+
+from subtitle_translator_v36 import Cue, CueTimeline, SrtTail, iter_srt_cues, parse_srt_lines
+
+
+def parse(text):
+    return [(cue.start, cue.end, cue.text) for cue in parse_srt_lines(text.splitlines())]
+
+
+def test_basic_blocks_and_multiline_text():
+    text = ("1\n00:00:01,000 --> 00:00:02,500\nHola\n\n"
+            "2\n00:00:03,000 --> 00:00:04,000\n¿Qué tal?\nBien.\n")
+    assert parse(text) == [(1.0, 2.5, "Hola"), (3.0, 4.0, "¿Qué tal? Bien.")]
+
+
+def test_crlf_and_leading_bom():
+    text = "\ufeff1\r\n00:00:01,000 --> 00:00:02,000\r\nHola\r\n\r\n2\r\n00:00:03,000 --> 00:00:04,000\r\nAdiós\r\n"
+    assert parse(text) == [(1.0, 2.0, "Hola"), (3.0, 4.0, "Adiós")]
+
+
+def test_bom_in_the_middle_of_concatenated_files():
+    text = ("1\n00:00:01,000 --> 00:00:02,000\nPrimero\n\n"
+            "\ufeff1\n00:10:00,000 --> 00:10:01,000\nSegundo\n")
+    assert parse(text) == [(1.0, 2.0, "Primero"), (600.0, 601.0, "Segundo")]
+
+
+def test_missing_indices_and_extra_blank_lines():
+    text = ("\n\n00:00:01,000 --> 00:00:02,000\nUno\n\n\n\n"
+            "00:00:03,000 --> 00:00:04,000\nDos\n")
+    assert parse(text) == [(1.0, 2.0, "Uno"), (3.0, 4.0, "Dos")]
+
+
+def test_numeric_cue_text_is_kept():
+    text = "1\n00:00:01,000 --> 00:00:02,000\n1984\n\n2\n00:00:03,000 --> 00:00:04,000\n42\n"
+    assert parse(text) == [(1.0, 2.0, "1984"), (3.0, 4.0, "42")]
+
+
+def test_bare_index_without_blank_line_belongs_to_next_block():
+    text = ("1\n00:00:01,000 --> 00:00:02,000\nHola\n"
+            "2\n00:00:03,000 --> 00:00:04,000\nAdiós\n")
+    assert parse(text) == [(1.0, 2.0, "Hola"), (3.0, 4.0, "Adiós")]
+
+
+def test_hours_past_99_and_short_milliseconds():
+    text = "1\n100:00:01,5 --> 100:00:02.25\nTarde\n"
+    assert parse(text) == [(360001.5, 360002.25, "Tarde")]
+
+
+def test_junk_and_empty_cues_are_skipped():
+    text = ("WEBVTT-ish header\n\n"
+            "1\n00:00:01,000 --> 00:00:02,000\n\n"
+            "2\n00:00:03,000 --> 00:00:04,000\nTexto\n\n"
+            "not a timing line\n")
+    assert parse(text) == [(3.0, 4.0, "Texto")]
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "utf-8-sig", "cp1252"])
+def test_iter_srt_cues_detects_encoding(tmp_path, encoding):
+    path = tmp_path / "sub.srt"
+    path.write_bytes("1\r\n00:00:01,000 --> 00:00:02,000\r\n¿Señor? ¡Adiós!\r\n".encode(encoding))
+    assert [cue.text for cue in iter_srt_cues(str(path))] == ["¿Señor? ¡Adiós!"]
+
+
+def timeline(*cues):
+    return CueTimeline(Cue(start, end, text) for start, end, text in cues)
+
+
+def test_find_in_cues_and_gaps():
+    cues = timeline((1.0, 2.0, "a"), (3.0, 4.0, "b"), (5.0, 6.0, "c"))
+    assert [cues.find(t) for t in (0.5, 1.0, 1.5, 2.5, 3.5, 6.0, 7.0)] == [-1, 0, 0, -1, 1, 2, -1]
+    assert cues.text_at(5.5) == "c"
+
+
+def test_find_after_seeking_backwards():
+    cues = timeline(*((float(i), i + 0.5, str(i)) for i in range(100)))
+    assert cues.find(90.2) == 90
+    assert cues.find(10.2) == 10
+    assert cues.find(10.7) == -1
+
+
+def test_overlapping_cues_resolve_to_the_earliest_active():
+    cues = timeline((1.0, 10.0, "long"), (2.0, 3.0, "short"), (11.0, 12.0, "after"))
+    assert cues.text_at(2.5) == "long"
+    assert cues.text_at(10.5) == ""
+    assert cues.text_at(11.5) == "after"
+
+
+def test_out_of_order_input_is_sorted():
+    cues = timeline((5.0, 6.0, "c"), (1.0, 2.0, "a"), (3.0, 4.0, "b"))
+    assert [cue.text for cue in cues] == ["a", "b", "c"]
+    assert cues.text_at(3.5) == "b"
+    cues.extend([Cue(0.0, 0.5, "first"), Cue(7.0, 8.0, "last")])
+    assert [cue.text for cue in cues] == ["first", "a", "b", "c", "last"]
+    assert [cues.text_at(t) for t in (0.2, 1.5, 7.5)] == ["first", "a", "last"]
+
+
+def test_srt_tail_parses_completed_blocks_only(tmp_path):
+    path = tmp_path / "partial.srt"
+    tail = SrtTail(str(path))
+    assert tail.read_new() == []
+    path.write_bytes(b"1\n00:00:01,000 --> 00:00:02,000\nHola\n\n2\n00:00:03,000 --> 00:00:04,000\nAdi")
+    assert [cue.text for cue in tail.read_new()] == ["Hola"]
+    with open(path, "ab") as f:
+        f.write(b"os\n\n")
+    assert [cue.text for cue in tail.read_new()] == ["Adios"]
+    assert tail.read_new(final=True) == []
+
+
+@pytest.mark.parametrize("newline", [b"\n", b"\r\n"])
+def test_srt_tail_keeps_a_partial_block_across_idle_reads(tmp_path, newline):
+    # ffmpeg flushes at arbitrary points; polls between flushes must not eat the pending bytes
+    path = tmp_path / "partial.srt"
+    blocks = (b"1\n10:00:01,000 --> 10:00:02,000\nHola\n\n"
+              b"2\n10:00:03,000 --> 10:00:04,000\nHola amigo\n\n").replace(b"\n", newline)
+    tail = SrtTail(str(path))
+    cues = []
+    for cut in (12, 60, len(blocks) - 6):
+        path.write_bytes(blocks[:cut])
+        for _ in range(5):
+            cues += tail.read_new()
+    path.write_bytes(blocks)
+    cues += tail.read_new()
+    assert [(cue.start, cue.text) for cue in cues] == [(36001.0, "Hola"), (36003.0, "Hola amigo")]
@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+
+from subtitle_translator_v36 import StubBackend, SubtitleTranslatorApp, TranslationCache, Translator
+
+LINE = "La casa de mi madre es muy grande hoy"
+
+
+def make_translator():
+    return Translator("stub", cache=TranslationCache(":memory:"), backend=StubBackend())
+
+
+def click(translator, word, sentence):
+    # What a word-mode click does: one counted lookup, then the line is translated on a worker
+    if translator.cached_translation(word) is not None:
+        return
+    app = SimpleNamespace(translator=translator)
+    return SubtitleTranslatorApp.translate_with_cue(app, word, sentence)
+
+
+def test_a_click_counts_one_lookup():
+    translator = make_translator()
+    assert click(translator, "casa", LINE) == "casa (en)"
+    assert (translator.cache.hits, translator.cache.misses) == (0, 1)
+    click(translator, "madre", LINE)  # Translated along with "casa"
+    assert (translator.cache.hits, translator.cache.misses) == (1, 1)
+
+
+def test_a_lone_missing_word_is_not_counted_twice():
+    translator = make_translator()
+    translator.translate_words(LINE.split(), record=False)
+    translator.cache.invalidate()
+    translator.cache.conn.execute("DELETE FROM translations WHERE word='casa'")
+    assert click(translator, "casa", LINE) == "casa (en)"
+    assert (translator.cache.hits, translator.cache.misses) == (0, 1)
+
+
+def test_context_clicks_count_one_lookup():
+    translator = make_translator()
+    assert translator.cached_in_context("casa", LINE) is None
+    translator.translate_in_context("casa", LINE, record=False)
+    assert (translator.cache.hits, translator.cache.misses) == (0, 1)